@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = int(
+    os.getenv('GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.getenv('GUNICORN_THREADS', default=2))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', default='-')
+
+PROCESS_LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def on_starting(server):
+    # Cached tokens, favorite ids and reference data versions are
+    # invalidated through the cache, which must be shared by the workers.
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    from django.conf import settings
+    backend = settings.CACHES['default']['BACKEND']
+    if backend == PROCESS_LOCAL_CACHE:
+        raise SystemExit(
+            'LocMemCache не общий для процессов: задайте CACHE_BACKEND '
+            'с общим кэшем или GUNICORN_WORKERS=1.'
+        )
+
+
+def when_ready(server):
+    if preload_app:
+        from common.warmup import warmup
+        warmup()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # A memcached socket shared by several workers mixes up replies.
+        from django.core.cache import caches
+        from django.db import connections
+        connections.close_all()
+        for cache in caches.all():
+            cache.close()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        from common.warmup import warmup
+        warmup()
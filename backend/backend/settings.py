@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,9 +66,64 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', default='False')
+            == 'True'
+        ),
     }
 }
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', default='True') == 'True'
+
+
+# Cache invalidations have to reach every gunicorn worker, so the default
+# is the shared memcached service; a process-local cache is only fit for
+# a single worker (see gunicorn_config.py).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.PyMemcacheCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+    }
+}
+
+REFERENCE_CACHE_TIMEOUT = int(
+    os.getenv('REFERENCE_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+USER_RECIPES_CACHE_TIMEOUT = int(
+    os.getenv('USER_RECIPES_CACHE_TIMEOUT', default=60 * 60)
+)
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=5 * 60))
+
+FEED_FANOUT_MAX_SUBSCRIBERS = int(
+    os.getenv('FEED_FANOUT_MAX_SUBSCRIBERS', default=1000)
+)
+
+TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', default=7 * 24))
+TRENDING_HALF_LIFE_HOURS = int(
+    os.getenv('TRENDING_HALF_LIFE_HOURS', default=24)
+)
+
+SIMILAR_RECIPES_DIR = Path(
+    os.getenv('SIMILAR_RECIPES_DIR', default=BASE_DIR / 'similarity')
+)
+SIMILAR_RECIPES_TAG_WEIGHT = float(
+    os.getenv('SIMILAR_RECIPES_TAG_WEIGHT', default=0.5)
+)
+# Above this many recipes changed since the build, /similar/ stops scoring
+# them from the database and serves the index as built until a rebuild.
+SIMILAR_RECIPES_MAX_STALE = int(
+    os.getenv('SIMILAR_RECIPES_MAX_STALE', default=1000)
+)
+
+
+INGREDIENT_SEARCH_BACKEND = os.getenv(
+    'INGREDIENT_SEARCH_BACKEND', default='memory'
+)
 
 
 AUTH_USER_MODEL = 'users.User'
@@ -91,7 +147,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ),
 }
 
@@ -127,5 +183,36 @@ STATIC_ROOT = BASE_DIR / 'static_backend/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+RECIPE_THUMBNAIL_SIZE = (
+    int(os.getenv('RECIPE_THUMBNAIL_WIDTH', default=480)),
+    int(os.getenv('RECIPE_THUMBNAIL_HEIGHT', default=360)),
+)
+RECIPE_RENDITION_QUALITY = int(
+    os.getenv('RECIPE_RENDITION_QUALITY', default=80)
+)
+RECIPE_RENDITIONS_ASYNC = (
+    os.getenv('RECIPE_RENDITIONS_ASYNC', default='True') == 'True'
+)
+RECIPE_RENDITION_WORKERS = int(
+    os.getenv('RECIPE_RENDITION_WORKERS', default=2)
+)
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.getenv('RECIPE_IMAGE_MAX_PIXELS', default=40_000_000)
+)
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', default=256 * 1024)
+)
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR')
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='False') == 'True'
+# Besides administrators, only these addresses may read /metrics/.
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1'
+).split(',')
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
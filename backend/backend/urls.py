@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.urls.conf import include
 
+from common.views import metrics_view
+
 api = [
     path('', include('users.urls', namespace='users')),
     path('', include('recipes.urls', namespace='recipes')),
@@ -11,3 +14,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(api)),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics/', metrics_view, name='metrics'))
@@ -0,0 +1,425 @@
+import json
+import math
+from base64 import b64encode
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from unittest import mock
+from urllib.parse import quote, urlencode
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import IntegerField, Value
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment
+)
+from rest_framework.authtoken.models import Token
+
+from common.seeding import BATCH_SIZE, SIZES, seeded_database
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from users.models import User
+
+Case = namedtuple(
+    'Case', ('name', 'method', 'path', 'auth', 'cleanup', 'setup'),
+    defaults=(True, None, None),
+)
+
+DEEP_PAGE = 10000
+HEAVY_FAVORITES = 10000
+HEAVY_CART = 500
+HEAVY = 'heavy'
+
+
+def legacy_search_queryset(queryset, value):
+    """The `IngredientSearchFilter` query before the autocomplete index.
+
+    The default ordering is dropped: SQLite rejects `ORDER BY` inside the
+    parts of a `UNION`, and the outer `order_by` replaces it anyway.
+    """
+    queryset = queryset.order_by()
+    start_with_queryset = (
+        queryset.filter(name__istartswith=value).annotate(
+            order=Value(0, IntegerField())
+        )
+    )
+    contain_queryset = (
+        queryset.filter(name__icontains=value).exclude(
+            pk__in=(ingredient.pk for ingredient in start_with_queryset)
+        ).annotate(
+            order=Value(1, IntegerField())
+        )
+    )
+    return start_with_queryset.union(contain_queryset).order_by('order')
+
+
+@contextmanager
+def uncached_search(backend='memory', search_queryset=None):
+    """Run the ingredient search on every request.
+
+    Responses are not served from the cache, so the case measures the
+    search itself. `search_queryset` replaces the query of the database
+    backend.
+    """
+    patches = [
+        override_settings(INGREDIENT_SEARCH_BACKEND=backend),
+        mock.patch('recipes.mixins.cache', DummyCache('benchmark', {})),
+    ]
+    if search_queryset is not None:
+        patches.append(
+            mock.patch('recipes.search.search_queryset', search_queryset)
+        )
+    with ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+        yield
+
+
+def database_search():
+    return uncached_search('database')
+
+
+def legacy_search():
+    return uncached_search('database', legacy_search_queryset)
+
+
+CASES = (
+    Case('tags-list', 'get', '/api/tags/', auth=False),
+    Case(
+        'ingredients-search', 'get', '/api/ingredients/?name=ингредиент 1',
+        auth=False,
+    ),
+    Case(
+        'ingredients-search-index', 'get',
+        '/api/ingredients/?name=ингредиент 1', auth=False,
+        setup=uncached_search,
+    ),
+    Case(
+        'ingredients-search-database', 'get',
+        '/api/ingredients/?name=ингредиент 1', auth=False,
+        setup=database_search,
+    ),
+    Case(
+        'ingredients-search-legacy', 'get',
+        '/api/ingredients/?name=ингредиент 1', auth=False,
+        setup=legacy_search,
+    ),
+    Case(
+        'ingredients-search-letter-index', 'get',
+        '/api/ingredients/?name=и', auth=False, setup=uncached_search,
+    ),
+    Case(
+        'ingredients-search-letter-database', 'get',
+        '/api/ingredients/?name=и', auth=False, setup=database_search,
+    ),
+    Case(
+        'ingredients-search-letter-legacy', 'get',
+        '/api/ingredients/?name=и', auth=False, setup=legacy_search,
+    ),
+    Case('recipes-list-anonymous', 'get', '/api/recipes/', auth=False),
+    Case('recipes-list', 'get', '/api/recipes/'),
+    Case('recipes-list-page', 'get', '/api/recipes/?page=5', auth=False),
+    Case(
+        'recipes-list-page-first', 'get', '/api/recipes/?page=1&limit=10',
+        auth=False,
+    ),
+    Case(
+        'recipes-list-page-deep', 'get',
+        '/api/recipes/?page={deep_page}&limit=10', auth=False,
+    ),
+    Case('recipes-list-cursor', 'get', '/api/recipes/?cursor=', auth=False),
+    Case(
+        'recipes-list-cursor-deep', 'get',
+        '/api/recipes/?cursor={deep_cursor}&limit=10', auth=False,
+    ),
+    Case(
+        'recipes-list-popular', 'get', '/api/recipes/?ordering=popular',
+        auth=False,
+    ),
+    Case(
+        'recipes-list-trending', 'get', '/api/recipes/?ordering=trending',
+        auth=False,
+    ),
+    Case('recipes-list-tags', 'get', '/api/recipes/?tags={tag}'),
+    Case('recipes-list-favorited', 'get', '/api/recipes/?is_favorited=1'),
+    Case(
+        'recipes-list-favorited-heavy', 'get', '/api/recipes/?is_favorited=1',
+        auth=HEAVY,
+    ),
+    Case(
+        'recipes-list-not-favorited-heavy', 'get',
+        '/api/recipes/?is_favorited=0', auth=HEAVY,
+    ),
+    Case(
+        'recipes-list-in-shopping-cart', 'get',
+        '/api/recipes/?is_in_shopping_cart=1',
+    ),
+    Case('recipes-detail', 'get', '/api/recipes/{recipe}/'),
+    Case('recipes-feed', 'get', '/api/recipes/feed/'),
+    Case(
+        'recipes-download-shopping-cart', 'get',
+        '/api/recipes/download_shopping_cart/',
+    ),
+    Case(
+        'recipes-download-shopping-cart-heavy', 'get',
+        '/api/recipes/download_shopping_cart/', auth=HEAVY,
+    ),
+    Case(
+        'recipes-favorite', 'post', '/api/recipes/{other_recipe}/favorite/',
+        cleanup='delete',
+    ),
+    Case(
+        'recipes-shopping-cart', 'post',
+        '/api/recipes/{other_recipe}/shopping_cart/',
+        cleanup='delete',
+    ),
+    Case('users-list', 'get', '/api/users/'),
+    Case('users-me', 'get', '/api/users/me/'),
+    Case('users-detail', 'get', '/api/users/{author}/'),
+    Case(
+        'users-subscriptions', 'get',
+        '/api/users/subscriptions/?recipes_limit=3',
+    ),
+    Case(
+        'users-subscribe', 'post', '/api/users/{other_author}/subscribe/',
+        cleanup='delete',
+    ),
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+def get_deep_page():
+    """Page 10 000 of ten recipes, or the last full page of a smaller set.
+
+    The cursor points at the same page, so both pagination modes read
+    identical rows.
+    """
+    page = max(min(DEEP_PAGE, Recipe.objects.count() // 10), 1)
+    if page == 1:
+        return page, ''
+    position = Recipe.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    )[(page - 1) * 10 - 1]
+    cursor = b64encode(urlencode({'p': position}).encode()).decode()
+    return page, quote(cursor)
+
+
+def create_heavy_user():
+    """A user with a long favorites list and a large shopping cart.
+
+    Up to `HEAVY_FAVORITES` favorites and `HEAVY_CART` recipes in the cart,
+    fewer only if the dataset has fewer recipes.
+    """
+    user = User.objects.create(
+        username=HEAVY,
+        email=f'{HEAVY}@example.com',
+        first_name=HEAVY,
+        last_name=HEAVY,
+    )
+    Favorite.objects.bulk_create(
+        (
+            Favorite(user=user, recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.order_by('pk').values_list(
+                'pk', flat=True
+            )[:HEAVY_FAVORITES]
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    cart = ShoppingCart.objects.create(user=user)
+    ShoppingCart.recipes.through.objects.bulk_create(
+        ShoppingCart.recipes.through(shoppingcart=cart, recipe_id=recipe_id)
+        for recipe_id in Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[:HEAVY_CART]
+    )
+    return user
+
+
+def get_context(user):
+    favorited = user.favorites.values('recipe')
+    in_cart = user.shopping_cart.recipes.values('pk')
+    subscribed = user.subscriber.values('author')
+    deep_page, deep_cursor = get_deep_page()
+    return {
+        'deep_page': deep_page,
+        'deep_cursor': deep_cursor,
+        'recipe': Recipe.objects.filter(pk__in=favorited).first().pk,
+        'other_recipe': Recipe.objects.exclude(pk__in=favorited).exclude(
+            pk__in=in_cart
+        ).first().pk,
+        'author': User.objects.filter(pk__in=subscribed).first().pk,
+        'other_author': User.objects.exclude(pk__in=subscribed).exclude(
+            pk=user.pk
+        ).first().pk,
+        'tag': Tag.objects.first().slug,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95 задержки и число SQL-запросов эндпоинтов API '
+        'на сгенерированных данных во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', choices=SIZES, default=('small',),
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', type=Path, default=Path('benchmark.json'),
+        )
+        parser.add_argument(
+            '--compare',
+            type=Path,
+            help='Сравнить с сохранённым результатом и найти регрессии.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый относительный рост p95.',
+        )
+        parser.add_argument(
+            '--min-delta',
+            type=float,
+            default=1.0,
+            help='Рост p95 меньше стольких миллисекунд не считается.',
+        )
+
+    def request(self, client, method, path):
+        response = getattr(client, method)(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, case, clients, context, iterations, warmup):
+        client = clients[case.auth]
+        path = case.path.format(**context)
+        timings, queries = [], []
+        with case.setup() if case.setup else nullcontext():
+            for i in range(warmup + iterations):
+                with CaptureQueriesContext(connection) as captured:
+                    started = perf_counter()
+                    response = self.request(client, case.method, path)
+                    elapsed = perf_counter() - started
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(captured))
+                if case.cleanup:
+                    self.request(client, case.cleanup, path)
+        return {
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': max(queries),
+        }
+
+    def run_size(self, size, options):
+        started = perf_counter()
+        with seeded_database(size, options['seed']) as config:
+            self.stdout.write(
+                f'{size}: данные созданы за {perf_counter() - started:.1f} с.'
+            )
+            user = User.objects.filter(
+                favorites__isnull=False,
+                shopping_cart__recipes__isnull=False,
+                subscriber__isnull=False,
+            ).order_by('pk').first()
+            token = Token.objects.create(user=user)
+            heavy_token = Token.objects.create(user=create_heavy_user())
+            clients = {
+                False: Client(),
+                True: Client(HTTP_AUTHORIZATION=f'Token {token.key}'),
+                HEAVY: Client(
+                    HTTP_AUTHORIZATION=f'Token {heavy_token.key}'
+                ),
+            }
+            context = get_context(user)
+            results = {}
+            for case in CASES:
+                results[case.name] = result = self.measure(
+                    case, clients, context,
+                    options['iterations'], options['warmup'],
+                )
+                self.stdout.write(
+                    f'  {case.name:<40} {result["status"]} '
+                    f'p50={result["p50_ms"]:>8.2f} мс '
+                    f'p95={result["p95_ms"]:>8.2f} мс '
+                    f'запросов={result["queries"]}'
+                )
+        return {'dataset': config, 'results': results}
+
+    def compare(self, report, baseline, tolerance, min_delta):
+        regressions = []
+        for size, current in report['sizes'].items():
+            previous = baseline['sizes'].get(size)
+            if previous is None:
+                continue
+            for name, result in current['results'].items():
+                before = previous['results'].get(name)
+                if before is None:
+                    continue
+                if result['queries'] > before['queries']:
+                    regressions.append(
+                        f'{size} {name}: запросов {before["queries"]} -> '
+                        f'{result["queries"]}'
+                    )
+                delta = result['p95_ms'] - before['p95_ms']
+                if (
+                    delta > min_delta
+                    and result['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                ):
+                    regressions.append(
+                        f'{size} {name}: p95 {before["p95_ms"]} -> '
+                        f'{result["p95_ms"]} мс'
+                    )
+        return regressions
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations должен быть больше 0.')
+        baseline = None
+        if options['compare']:
+            if not options['compare'].exists():
+                raise CommandError(f'Файл {options["compare"]} не найден.')
+            baseline = json.loads(options['compare'].read_text())
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'vendor': connection.vendor,
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+            'sizes': {},
+        }
+        setup_test_environment()
+        try:
+            for size in options['sizes']:
+                report['sizes'][size] = self.run_size(size, options)
+        finally:
+            teardown_test_environment()
+        options['output'].write_text(
+            json.dumps(report, ensure_ascii=False, indent=2)
+        )
+        self.stdout.write(f'Результаты записаны в {options["output"]}.')
+        if baseline is None:
+            return
+        regressions = self.compare(
+            report, baseline, options['tolerance'], options['min_delta']
+        )
+        if regressions:
+            raise CommandError(
+                'Найдены регрессии:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено.'))
@@ -0,0 +1,224 @@
+import json
+from collections import namedtuple
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from common.seeding import SIZES, seeded_database
+from recipes.filters import RecipeFilter
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag, TimelineEntry
+from recipes.search import search_queryset
+from recipes.shopping_list import get_ingredients_queryset
+from users.models import Subscribe, User
+
+Check = namedtuple(
+    'Check', ('name', 'build', 'tables', 'force_index'), defaults=(False,),
+)
+
+RECIPE_TABLES = ('recipes_recipe',)
+SUBSCRIBE_TABLES = ('users_subscribe',)
+
+
+def filtered_recipes(context, data):
+    request = SimpleNamespace(user=context['user'])
+    return RecipeFilter(data, Recipe.objects.all(), request=request).qs[:10]
+
+
+def raw_sql(queryset):
+    if hasattr(queryset, 'raw_query'):
+        return queryset.raw_query, queryset.params
+    return queryset.query.sql_with_params()
+
+
+CHECKS = (
+    Check(
+        'recipes-by-author',
+        lambda context: Recipe.objects.filter(
+            author=context['author']
+        ).order_by('-pk')[:10],
+        RECIPE_TABLES,
+    ),
+    Check(
+        'recipes-latest-by-author',
+        lambda context: Recipe.objects.latest_by_author(
+            context['authors'], 3
+        ),
+        RECIPE_TABLES,
+    ),
+    Check(
+        'recipes-favorited',
+        lambda context: filtered_recipes(context, {'is_favorited': 'true'}),
+        RECIPE_TABLES + ('recipes_favorite',),
+    ),
+    Check(
+        'recipes-in-shopping-cart',
+        lambda context: filtered_recipes(
+            context, {'is_in_shopping_cart': 'true'}
+        ),
+        RECIPE_TABLES + ('recipes_shoppingcart_recipes',),
+    ),
+    Check(
+        'recipes-by-tag',
+        lambda context: filtered_recipes(context, {'tags': [context['tag']]}),
+        ('recipes_recipe_tags',),
+    ),
+    Check(
+        'recipes-popular',
+        lambda context: filtered_recipes(context, {'ordering': 'popular'}),
+        RECIPE_TABLES,
+    ),
+    Check(
+        'feed-timeline',
+        lambda context: TimelineEntry.objects.filter(
+            user=context['user']
+        ).order_by('-recipe_id').values_list('recipe_id', flat=True)[:10],
+        ('recipes_timelineentry',),
+    ),
+    Check(
+        'recipe-in-shopping-cart',
+        lambda context: ShoppingCart.recipes.through.objects.filter(
+            shoppingcart__user=context['user'], recipe=context['recipe']
+        ),
+        ('recipes_shoppingcart_recipes',),
+    ),
+    Check(
+        'shopping-list',
+        lambda context: get_ingredients_queryset(context['user']),
+        ('recipes_shoppingcart_recipes', 'recipes_recipeingredient'),
+    ),
+    Check(
+        'ingredients-prefix',
+        lambda context: Ingredient.objects.filter(
+            name__istartswith=context['prefix']
+        )[:10],
+        ('recipes_ingredient',),
+        force_index=True,
+    ),
+    Check(
+        'ingredients-search',
+        lambda context: search_queryset(
+            Ingredient.objects.all(), context['prefix']
+        )[:10],
+        ('recipes_ingredient',),
+        force_index=True,
+    ),
+    Check(
+        'subscriptions',
+        lambda context: User.objects.filter(
+            subscribing__user=context['user']
+        )[:10],
+        SUBSCRIBE_TABLES,
+    ),
+    Check(
+        'subscribe-exists',
+        lambda context: Subscribe.objects.filter(
+            user=context['user'], author=context['author']
+        ),
+        SUBSCRIBE_TABLES,
+    ),
+    Check(
+        'subscribers',
+        lambda context: Subscribe.objects.filter(
+            author=context['author']
+        ).values('user'),
+        SUBSCRIBE_TABLES,
+    ),
+)
+
+
+def get_context():
+    user = User.objects.filter(
+        favorites__isnull=False,
+        shopping_cart__recipes__isnull=False,
+        subscriber__isnull=False,
+    ).order_by('pk').first()
+    if user is None:
+        raise CommandError(
+            'Нет пользователя с избранным, списком покупок и подписками.'
+        )
+    ingredient = Ingredient.objects.order_by('pk').first()
+    return {
+        'user': user,
+        'author': User.objects.annotate(
+            subscribers=Count('subscribing')
+        ).order_by('-subscribers').first(),
+        'authors': list(
+            user.subscriber.values_list('author_id', flat=True)[:10]
+        ),
+        'recipe': user.shopping_cart.recipes.first(),
+        'tag': Tag.objects.order_by('pk').first().slug,
+        'prefix': ingredient.name[:3],
+    }
+
+
+def find_seq_scans(plan, tables):
+    if plan.get('Node Type') == 'Seq Scan':
+        if plan.get('Relation Name') in tables:
+            yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from find_seq_scans(child, tables)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов API на PostgreSQL и падает, если '
+        'по большим таблицам используется последовательное сканирование.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            choices=SIZES,
+            help='Проверить на временной базе с данными этого размера.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def explain(self, check, context):
+        """Plan of the check's query.
+
+        The ingredient catalog is small enough for a sequential scan to be
+        the cheapest plan, so for `force_index` checks sequential scans are
+        disabled and the plan only proves that a matching index exists.
+        """
+        sql, params = raw_sql(check.build(context))
+        with transaction.atomic(), connection.cursor() as cursor:
+            if check.force_index:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов работает только с PostgreSQL.')
+        database = (
+            seeded_database(options['size'], options['seed'])
+            if options['size'] else nullcontext()
+        )
+        failures = []
+        with database:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            context = get_context()
+            for check in CHECKS:
+                scans = sorted(set(find_seq_scans(
+                    self.explain(check, context), check.tables
+                )))
+                if scans:
+                    failures.append(f'{check.name}: {", ".join(scans)}')
+                    self.stdout.write(self.style.ERROR(
+                        f'{check.name}: Seq Scan по {", ".join(scans)}'
+                    ))
+                else:
+                    self.stdout.write(f'{check.name}: ok')
+        if failures:
+            raise CommandError(
+                'Последовательное сканирование в запросах:\n'
+                + '\n'.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы.'))
@@ -0,0 +1,78 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from common.seeding import BATCH_SIZE, generate
+from recipes.models import Ingredient, Tag
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей, рецепты, избранное, списки покупок и '
+        'подписки со степенным распределением популярности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True)
+        parser.add_argument('--recipes', type=int, required=True)
+        parser.add_argument(
+            '--favorites', type=int, default=10,
+            help='Среднее число рецептов в избранном у пользователя.',
+        )
+        parser.add_argument(
+            '--cart', type=int, default=3,
+            help='Среднее число рецептов в списке покупок.',
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее число подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения популярности.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        for name in ('recipes', 'favorites', 'cart', 'subscriptions'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} не может быть меньше 0.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0.')
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Нет ингредиентов: сначала выполните import_ingredients.'
+            )
+        if not Tag.objects.exists():
+            raise CommandError('Нет тегов: создайте их в админке.')
+        started = perf_counter()
+        with transaction.atomic():
+            created = generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                favorites=options['favorites'],
+                cart=options['cart'],
+                subscriptions=options['subscriptions'],
+                alpha=options['alpha'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+        elapsed = perf_counter() - started
+        rows = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {created["users"]}, '
+            f'рецептов: {created["recipes"]}, '
+            f'ингредиентов в рецептах: {created["ingredients"]}, '
+            f'тегов рецептов: {created["tags"]}, '
+            f'избранного: {created["favorites"]}, '
+            f'рецептов в списках покупок: {created["cart"]}, '
+            f'подписок: {created["subscriptions"]}, '
+            f'записей лент: {created["timeline"]}, '
+            f'событий: {created["events"]}, '
+            f'рецептов в рейтинге: {created["rankings"]} '
+            f'за {elapsed:.1f} с ({rows / elapsed:.0f} строк/с).'
+        ))
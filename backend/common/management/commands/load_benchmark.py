@@ -0,0 +1,103 @@
+import math
+from http.client import HTTPConnection
+from threading import Lock, Thread
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = (
+    '/api/recipes/',
+    '/api/tags/',
+    '/api/recipes/?tags=tag-1',
+    '/api/ingredients/?name=%D0%B8%D0%BD%D0%B3',
+    '/api/users/1/',
+)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер смесью GET-запросов к API и выводит '
+        'пропускную способность и задержки. Сервер запускается отдельно, '
+        'например gunicorn -c backend/gunicorn_config.py backend.wsgi '
+        'на базе, заполненной generate_fake_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--seconds', type=float, default=15)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--paths', nargs='+', default=PATHS)
+
+    def request(self, connection, path):
+        started = perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status, perf_counter() - started
+
+    def run_client(self, url, paths, deadline, results, lock):
+        connection = HTTPConnection(url.hostname, url.port or 80)
+        timings, errors = [], []
+        i = 0
+        try:
+            while perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                status, elapsed = self.request(connection, path)
+                if status != 200:
+                    errors.append(f'{path}: {status}')
+                timings.append(elapsed * 1000)
+                i += 1
+        finally:
+            connection.close()
+        with lock:
+            results['timings'] += timings
+            results['errors'] += errors
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['seconds'] <= 0:
+            raise CommandError(
+                '--concurrency и --seconds должны быть больше 0.'
+            )
+        url = urlsplit(options['url'])
+        connection = HTTPConnection(url.hostname, url.port or 80)
+        try:
+            status, first = self.request(connection, options['paths'][0])
+        finally:
+            connection.close()
+        if status != 200:
+            raise CommandError(f'Сервер ответил {status}.')
+        results = {'timings': [], 'errors': []}
+        lock = Lock()
+        started = perf_counter()
+        deadline = started + options['seconds']
+        clients = [
+            Thread(
+                target=self.run_client,
+                args=(url, options['paths'], deadline, results, lock),
+            )
+            for _ in range(options['concurrency'])
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = perf_counter() - started
+        timings = results['timings']
+        if results['errors']:
+            raise CommandError(
+                'Ошибочные ответы:\n' + '\n'.join(sorted(
+                    set(results['errors'])
+                ))
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings) / elapsed:.0f} запросов/с, '
+            f'p50={percentile(timings, 0.5):.1f} мс, '
+            f'p95={percentile(timings, 0.95):.1f} мс, '
+            f'первый запрос {first * 1000:.0f} мс.'
+        ))
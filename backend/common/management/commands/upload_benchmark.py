@@ -0,0 +1,99 @@
+import json
+import os
+import tracemalloc
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from rest_framework.test import force_authenticate
+
+from common.seeding import seeded_database
+from recipes.models import Ingredient, Tag
+from recipes.views import RecipeViewSet
+from users.models import User
+
+
+def make_image(width, height):
+    """A JPEG of random noise, which does not compress."""
+    buffer = BytesIO()
+    Image.frombytes(
+        'RGB', (width, height), os.urandom(width * height * 3)
+    ).save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пиковый объём памяти Python (tracemalloc) при создании '
+        'рецепта с картинкой в base64 внутри JSON и в multipart/form-data '
+        'во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=2400)
+        parser.add_argument('--height', type=int, default=1800)
+
+    def measure(self, request, user):
+        """Peak traced allocations of one create request.
+
+        The request runs in a rolled back transaction, so renditions,
+        which are built on commit, are not measured.
+        """
+        force_authenticate(request, user)
+        view = RecipeViewSet.as_view({'post': 'create'})
+        with transaction.atomic():
+            tracemalloc.start()
+            try:
+                response = view(request)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            transaction.set_rollback(True)
+        if response.status_code != 201:
+            raise CommandError(f'Рецепт не создан: {response.data}')
+        return peak
+
+    def handle(self, *args, **options):
+        image = make_image(options['width'], options['height'])
+        factory = RequestFactory()
+        with TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media
+        ), seeded_database('small'):
+            user = User.objects.order_by('pk').first()
+            fields = {
+                'name': 'Рецепт',
+                'text': 'Описание рецепта.',
+                'cooking_time': 10,
+            }
+            tags = [Tag.objects.order_by('pk').first().pk]
+            ingredients = [
+                {'id': Ingredient.objects.order_by('pk').first().pk,
+                 'amount': 100},
+            ]
+            base64 = self.measure(factory.post(
+                '/api/recipes/',
+                json.dumps(dict(
+                    fields,
+                    tags=tags,
+                    ingredients=ingredients,
+                    image='data:image/jpeg;base64,'
+                    + b64encode(image).decode(),
+                )),
+                content_type='application/json',
+            ), user)
+            multipart = self.measure(factory.post('/api/recipes/', dict(
+                fields,
+                tags=json.dumps(tags),
+                ingredients=json.dumps(ingredients),
+                image=SimpleUploadedFile('image.jpg', image, 'image/jpeg'),
+            )), user)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинка {len(image) / 2 ** 20:.1f} МиБ, пик памяти: '
+            f'JSON/base64 {base64 / 2 ** 20:.1f} МиБ, '
+            f'multipart {multipart / 2 ** 20:.1f} МиБ.'
+        ))
@@ -0,0 +1,96 @@
+from bisect import bisect_left
+from threading import Lock
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition format.
+
+    Values are kept per label set in the current process only, so every
+    worker reports its own series.
+    """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            counts, total = self.series.get(
+                labels, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self.series[labels] = (counts, total + value)
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self.lock:
+            series = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in sorted(self.series.items())
+            ]
+        for labels, counts, total in series:
+            label_text = ','.join(
+                f'{name}="{escape(value)}"' for name, value in labels
+            )
+            cumulative = 0
+            bounds = [str(bucket) for bucket in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            yield f'{self.name}_sum{{{label_text}}} {total}'
+            yield f'{self.name}_count{{{label_text}}} {cumulative}'
+
+    def clear(self):
+        with self.lock:
+            self.series = {}
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by view.',
+    SECONDS_BUCKETS,
+)
+request_queries = Histogram(
+    'http_request_sql_queries',
+    'SQL queries executed per request by view.',
+    QUERIES_BUCKETS,
+)
+request_sql_duration = Histogram(
+    'http_request_sql_duration_seconds',
+    'Time spent in SQL per request by view.',
+    SECONDS_BUCKETS,
+)
+HISTOGRAMS = (request_duration, request_queries, request_sql_duration)
+
+
+def observe(view, method, status, duration, queries, sql_duration):
+    labels = (('view', view), ('method', method), ('status', str(status)))
+    request_duration.observe(labels, duration)
+    request_queries.observe(labels, queries)
+    request_sql_duration.observe(labels, sql_duration)
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,79 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+UNRESOLVED_VIEW = 'unresolved'
+
+
+class QueryRecorder:
+    """`execute_wrapper` that counts queries and sums their duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+
+
+class InstrumentationMiddleware:
+    """Records latency and SQL usage per resolved view name.
+
+    The numbers go into the histograms served by the metrics endpoint and
+    into a `Server-Timing` header of the response. Streaming responses run
+    their queries while the body is sent, so they are recorded once the
+    stream is consumed and get no header.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, response, recorder,
+                start,
+            )
+            return response
+        duration = self.observe(request, response, recorder, start)
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries"'
+        )
+        return response
+
+    def stream(self, content, request, response, recorder, start):
+        try:
+            with connection.execute_wrapper(recorder):
+                yield from content
+        finally:
+            self.observe(request, response, recorder, start)
+
+    def observe(self, request, response, recorder, start):
+        duration = perf_counter() - start
+        match = request.resolver_match
+        metrics.observe(
+            match.view_name if match is not None else UNRESOLVED_VIEW,
+            request.method,
+            response.status_code,
+            duration,
+            recorder.count,
+            recorder.duration,
+        )
+        return duration
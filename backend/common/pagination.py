@@ -1,6 +1,40 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = 10
+    ordering = '-pk'
 
 
 class LimitPageNumberPagination(PageNumberPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    Passing `?cursor=` (empty for the first page) switches the request to
+    `LimitCursorPagination`, which skips the `COUNT(*)` and the `OFFSET`
+    scan. Without it responses keep the page number format. Requests with
+    an explicit `?ordering=` always use page numbers, since the keyset is
+    the primary key.
+    """
     page_size_query_param = 'limit'
     page_size = 10
+    cursor_pagination_class = LimitCursorPagination
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    cursor_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            self.cursor_query_param in request.query_params
+            and not request.query_params.get(self.ordering_query_param)
+        ):
+            self.cursor_pagination = self.cursor_pagination_class()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,320 @@
+import io
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+from random import Random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from recipes.counters import recount
+from recipes.feed import fill_timelines
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeEvent,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+    TimelineEntry
+)
+from recipes.rankings import refresh_rankings
+from users.models import Subscribe, User
+
+BATCH_SIZE = 5000
+PASSWORD = 'fake-password'
+IMAGE = 'recipes/images/fake.gif'
+INGREDIENTS_PER_RECIPE = (3, 12)
+TAGS_PER_RECIPE = (1, 3)
+
+SIZES = {
+    'small': {
+        'users': 20, 'recipes': 100, 'ingredients': 200, 'tags': 6,
+        'favorites': 5, 'cart': 3, 'subscriptions': 3,
+    },
+    'medium': {
+        'users': 200, 'recipes': 2000, 'ingredients': 1000, 'tags': 12,
+        'favorites': 20, 'cart': 5, 'subscriptions': 10,
+    },
+    'large': {
+        'users': 1000, 'recipes': 20000, 'ingredients': 2000, 'tags': 20,
+        'favorites': 50, 'cart': 10, 'subscriptions': 30,
+    },
+    # Enough recipes for page 10 000 of the list at the default page size.
+    'deep': {
+        'users': 2000, 'recipes': 100000, 'ingredients': 2000, 'tags': 20,
+        'favorites': 10, 'cart': 3, 'subscriptions': 10,
+    },
+}
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class Writer:
+    """Inserts model instances in batches.
+
+    On PostgreSQL every batch is sent with `COPY ... FROM STDIN`, which
+    skips the per-row `INSERT` parsing; other databases use `bulk_create`.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.use_copy = connection.vendor == 'postgresql'
+
+    def copy(self, model, objs):
+        fields = [
+            field for field in model._meta.local_concrete_fields
+            if not field.primary_key
+        ]
+        buffer = io.StringIO()
+        for obj in objs:
+            buffer.write('\t'.join(
+                copy_value(
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname), connection
+                    )
+                )
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f'({columns}) FROM STDIN',
+                buffer,
+            )
+
+    def write(self, model, objs):
+        """Insert `objs` and return how many rows were written."""
+        total = 0
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                return total
+            if self.use_copy:
+                self.copy(model, batch)
+            else:
+                model.objects.bulk_create(batch)
+            total += len(batch)
+
+    def write_returning_ids(self, model, objs):
+        """Insert `objs` and return the ids assigned to them, in order."""
+        last_pk = (
+            model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            or 0
+        )
+        self.write(model, objs)
+        return list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+
+def power_law_weights(items, alpha, random):
+    """Cumulative Zipf weights over `items` in a random popularity order."""
+    items = list(items)
+    random.shuffle(items)
+    return items, list(
+        accumulate(1 / rank ** alpha for rank in range(1, len(items) + 1))
+    )
+
+
+def pick_unique(random, items, cum_weights, count):
+    """Up to `count` distinct items drawn with the given weights."""
+    count = min(count, len(items))
+    picked = set()
+    attempts = 0
+    while len(picked) < count and attempts < count * 10:
+        picked.update(random.choices(
+            items, cum_weights=cum_weights, k=count - len(picked)
+        ))
+        attempts += count
+    return picked
+
+
+def generate(users, recipes, favorites=10, cart=3, subscriptions=5,
+             alpha=1.1, seed=0, batch_size=BATCH_SIZE, prefix='fake'):
+    """Generate users with recipes, favorites, carts and subscriptions.
+
+    Recipe authors, favorited recipes, subscribed authors and ingredients
+    follow a power law with exponent `alpha`; per user counts are drawn
+    around the given means. Tags and ingredients come from the existing
+    catalog. The same arguments always produce the same rows, except for
+    the activity timestamps, which are relative to the current time.
+    """
+    random = Random(seed)
+    writer = Writer(batch_size)
+    tags = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+    ingredients = list(
+        Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    password = make_password(PASSWORD)
+    user_ids = writer.write_returning_ids(User, (
+        User(
+            email=f'{prefix}{seed}.{i}@example.com',
+            username=f'{prefix}{seed}.{i}',
+            first_name=f'Имя {i}',
+            last_name=f'Фамилия {i}',
+            password=password,
+        )
+        for i in range(users)
+    ))
+    authors, author_weights = power_law_weights(user_ids, alpha, random)
+    recipe_ids = writer.write_returning_ids(Recipe, (
+        Recipe(
+            author_id=author_id,
+            name=f'Рецепт {i}',
+            image=IMAGE,
+            text='Описание рецепта.',
+            cooking_time=random.randint(5, 180),
+        )
+        for i, author_id in enumerate(
+            random.choices(authors, cum_weights=author_weights, k=recipes)
+        )
+    ))
+    ingredients, ingredient_weights = power_law_weights(
+        ingredients, alpha, random
+    )
+    created = {'users': len(user_ids), 'recipes': len(recipe_ids)}
+    created['ingredients'] = writer.write(RecipeIngredient, (
+        RecipeIngredient(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=random.randint(1, 1000),
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in pick_unique(
+            random, ingredients, ingredient_weights,
+            random.randint(*INGREDIENTS_PER_RECIPE),
+        )
+    ))
+    created['tags'] = writer.write(Recipe.tags.through, (
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in random.sample(
+            tags, min(random.randint(*TAGS_PER_RECIPE), len(tags))
+        )
+    ))
+    popular, popular_weights = power_law_weights(recipe_ids, alpha, random)
+    favorite_pairs = [
+        (user_id, recipe_id)
+        for user_id in user_ids
+        for recipe_id in pick_unique(
+            random, popular, popular_weights,
+            round(random.expovariate(1 / favorites)) if favorites else 0,
+        )
+    ]
+    created['favorites'] = writer.write(Favorite, (
+        Favorite(user_id=user_id, recipe_id=recipe_id)
+        for user_id, recipe_id in favorite_pairs
+    ))
+    cart_ids = writer.write_returning_ids(ShoppingCart, (
+        ShoppingCart(user_id=user_id) for user_id in user_ids
+    ))
+    cart_pairs = [
+        (cart_id, recipe_id)
+        for cart_id in cart_ids
+        for recipe_id in pick_unique(
+            random, popular, popular_weights,
+            round(random.expovariate(1 / cart)) if cart else 0,
+        )
+    ]
+    created['cart'] = writer.write(ShoppingCart.recipes.through, (
+        ShoppingCart.recipes.through(
+            shoppingcart_id=cart_id, recipe_id=recipe_id
+        )
+        for cart_id, recipe_id in cart_pairs
+    ))
+    created['subscriptions'] = writer.write(Subscribe, (
+        Subscribe(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in pick_unique(
+            random, authors, author_weights,
+            round(random.expovariate(1 / subscriptions))
+            if subscriptions else 0,
+        )
+        if author_id != user_id
+    ))
+    # Spread the activity over the trending window so that the rankings
+    # have something to decay.
+    now = timezone.now()
+    window = timedelta(hours=settings.TRENDING_WINDOW_HOURS).total_seconds()
+    created['events'] = writer.write(RecipeEvent, (
+        RecipeEvent(
+            recipe_id=recipe_id,
+            kind=kind,
+            delta=1,
+            created=now - timedelta(seconds=random.uniform(0, window)),
+        )
+        for kind, pairs in (
+            (RecipeEvent.FAVORITE, favorite_pairs),
+            (RecipeEvent.SHOPPING_CART, cart_pairs),
+        )
+        for _, recipe_id in pairs
+    ))
+    recount(Recipe, User, Favorite, Subscribe)
+    created['timeline'] = fill_timelines(
+        TimelineEntry, Subscribe, settings.FEED_FANOUT_MAX_SUBSCRIBERS
+    )
+    created['rankings'] = refresh_rankings(now)['ranked']
+    return created
+
+
+def seed_dataset(size, seed=0):
+    """Fill an empty database with a dataset of the given size."""
+    config = SIZES[size]
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {i}', color=f'#{i:06x}', slug=f'tag-{i}')
+        for i in range(config['tags'])
+    )
+    Ingredient.objects.bulk_create(
+        (
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(config['ingredients'])
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    generate(
+        users=config['users'],
+        recipes=config['recipes'],
+        favorites=config['favorites'],
+        cart=config['cart'],
+        subscriptions=config['subscriptions'],
+        seed=seed,
+    )
+    return config
+
+
+@contextmanager
+def seeded_database(size, seed=0):
+    """Switch to a throwaway test database filled by `seed_dataset`.
+
+    Yields the dataset configuration; the database is dropped on exit.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        cache.clear()
+        yield seed_dataset(size, seed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -3,7 +3,31 @@ from rest_framework import serializers
 from recipes.models import Recipe
 
 
+class RenditionsField(serializers.ReadOnlyField):
+    """Absolute URLs of the ready image renditions of a recipe."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'renditions')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        storage = Recipe._meta.get_field('image').storage
+        request = self.context.get('request')
+        urls = {}
+        for name, path in value.items():
+            if name == 'source':
+                continue
+            url = storage.url(path)
+            urls[name] = (
+                request.build_absolute_uri(url) if request is not None
+                else url
+            )
+        return urls
+
+
 class RecipeShortReadSerializer(serializers.ModelSerializer):
+    image_renditions = RenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time',)
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time',)
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Drop persistent connections the database has closed meanwhile.
+
+    Django 3.2 has no `CONN_HEALTH_CHECKS`, so a reused connection is
+    pinged when a request starts and reopened on first use if it is gone.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
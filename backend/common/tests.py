@@ -0,0 +1,40 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from . import metrics
+from .middleware import UNRESOLVED_VIEW, InstrumentationMiddleware
+from .views import metrics_view
+from users.models import User
+
+LABELS = (('view', UNRESOLVED_VIEW), ('method', 'GET'), ('status', '200'))
+
+
+@override_settings(METRICS_ENABLED=True)
+class InstrumentationMiddlewareTest(TestCase):
+
+    def setUp(self):
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+
+    def test_streamed_queries_are_recorded(self):
+        def stream():
+            yield str(User.objects.count())
+            yield str(User.objects.exists())
+
+        middleware = InstrumentationMiddleware(
+            lambda request: StreamingHttpResponse(stream())
+        )
+        response = middleware(RequestFactory().get('/'))
+        self.assertNotIn(LABELS, metrics.request_queries.series)
+        self.assertEqual(b''.join(response.streaming_content), b'0False')
+        response.close()
+        _, queries = metrics.request_queries.series[LABELS]
+        self.assertEqual(queries, 2)
+
+    def test_metrics_are_not_public(self):
+        request = RequestFactory().get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        self.assertEqual(metrics_view(request).status_code, 403)
+        request.META['REMOTE_ADDR'] = '127.0.0.1'
+        self.assertEqual(metrics_view(request).status_code, 200)
@@ -0,0 +1,27 @@
+from django.core.cache import caches
+from django.db import connections
+from django.urls import reverse
+
+from recipes.cache import INGREDIENTS, TAGS, get_tag_ids, get_version
+from recipes.search import ingredient_index
+from recipes.similarity import similarity_index
+
+
+def warmup():
+    """Import the views and fill process-local caches.
+
+    Called in the gunicorn master before it forks, so every worker starts
+    with the URL resolver populated, the ingredient index built and the
+    similar recipes index opened.
+    Database and cache connections are closed afterwards and never cross
+    a fork.
+    """
+    reverse('recipes:recipes-list')
+    get_version(TAGS)
+    get_version(INGREDIENTS)
+    get_tag_ids()
+    ingredient_index.refresh()
+    similarity_index.refresh()
+    connections.close_all()
+    for cache in caches.all():
+        cache.close()
@@ -1,11 +1,11 @@
-from django.contrib.admin import ModelAdmin, display, register
+from django.contrib.admin import ModelAdmin, TabularInline, display, register
 from django.db.models import Count, Sum
 
 from .models import (
-    CountOfIngredient,
     Favorite,
     Ingredient,
     Recipe,
+    RecipeIngredient,
     ShoppingCart,
     Tag
 )
@@ -18,37 +18,23 @@ class TagAdmin(ModelAdmin):
     ordering = ('color',)
 
 
-@register(CountOfIngredient)
-class CountOfIngredientAdmin(ModelAdmin):
-    list_display = (
-        'id', 'ingredient', 'amount', 'get_measurement_unit',
-        'get_recipes_count',
-    )
-    readonly_fields = ('get_measurement_unit',)
-    list_filter = ('ingredient',)
-    ordering = ('ingredient',)
-
-    @display(description='Единица измерения')
-    def get_measurement_unit(self, obj):
-        try:
-            return obj.ingredient.measurement_unit
-        except CountOfIngredient.ingredient.RelatedObjectDoesNotExist:
-            return 'Пусто'
-
-    @display(description='Количество ссылок в рецептах')
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+class RecipeIngredientInline(TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+    min_num = 1
+    extra = 0
 
 
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
-    list_display = ('name', 'author',)
+    list_display = ('name', 'author', 'favorites_count',)
     list_filter = ('name', 'author', 'tags',)
     readonly_fields = ('added_in_favorites',)
+    inlines = (RecipeIngredientInline,)
 
     @display(description='Общее число добавлений в избранное')
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @register(Ingredient)
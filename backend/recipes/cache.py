@@ -0,0 +1,110 @@
+from hashlib import md5
+from time import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Favorite, ShoppingCart, Tag
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+
+
+def get_version_key(group):
+    return f'recipes:{group}:version'
+
+
+def get_version(group):
+    """Time of the last change in the group, used as Last-Modified."""
+    key = get_version_key(group)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    version = time()
+    cache.add(key, version, None)
+    return cache.get(key, version)
+
+
+def invalidate(group):
+    cache.set(get_version_key(group), time(), None)
+
+
+def get_response_key(group, version, request):
+    digest = md5(
+        f'{request.get_full_path()}|{request.META.get("HTTP_ACCEPT", "")}'
+        .encode()
+    ).hexdigest()
+    return f'recipes:{group}:{version}:{digest}'
+
+
+def get_user_recipes_version_key(kind, user_id):
+    return f'recipes:{kind}:user:{user_id}:version'
+
+
+def load_recipe_ids(kind, user_id):
+    if kind == FAVORITES:
+        queryset = Favorite.objects.filter(user_id=user_id)
+    else:
+        queryset = ShoppingCart.recipes.through.objects.filter(
+            shoppingcart__user_id=user_id
+        )
+    return frozenset(queryset.values_list('recipe_id', flat=True))
+
+
+def get_recipe_ids(request, kind):
+    """Ids of recipes the user favorited or put in the cart.
+
+    The set is read from the cache at most once per request and loaded
+    from the database only when the cache has no entry for the user.
+    Entries are keyed by a per-user version that changes on every write,
+    so a set loaded before a write can never be read after it.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, 'recipe_ids'):
+        request.recipe_ids = {}
+    if kind not in request.recipe_ids:
+        version_key = get_user_recipes_version_key(kind, user.pk)
+        version = cache.get(version_key)
+        if version is None:
+            version = uuid4().hex
+            cache.add(version_key, version, None)
+            version = cache.get(version_key, version)
+        key = f'recipes:{kind}:user:{user.pk}:{version}'
+        recipe_ids = cache.get(key)
+        if recipe_ids is None:
+            recipe_ids = load_recipe_ids(kind, user.pk)
+            cache.set(key, recipe_ids, settings.USER_RECIPES_CACHE_TIMEOUT)
+        request.recipe_ids[kind] = recipe_ids
+    return request.recipe_ids[kind]
+
+
+def invalidate_recipe_ids(kind, user_ids):
+    """Switch the users to a new version once the transaction commits."""
+    user_ids = tuple(user_ids)
+    transaction.on_commit(lambda: cache.set_many(
+        {
+            get_user_recipes_version_key(kind, user_id): uuid4().hex
+            for user_id in user_ids
+        },
+        None,
+    ))
+
+
+def get_tag_ids():
+    """Mapping of tag slugs to ids, cached until tags change."""
+    key = f'recipes:{TAGS}:{get_version(TAGS)}:ids'
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.REFERENCE_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
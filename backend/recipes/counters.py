@@ -0,0 +1,36 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    """Correlated `COUNT(*)` of `queryset` rows whose `field` is the row."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount(recipe_model, user_model, favorite_model, subscribe_model):
+    """Rebuild the denormalized counters from the source tables."""
+    return (
+        recipe_model.objects.update(
+            favorites_count=count_subquery(
+                favorite_model.objects.all(), 'recipe'
+            ),
+        ),
+        user_model.objects.update(
+            recipes_count=count_subquery(
+                recipe_model.objects.all(), 'author'
+            ),
+            subscribers_count=count_subquery(
+                subscribe_model.objects.all(), 'author'
+            ),
+        ),
+    )
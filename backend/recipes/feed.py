@@ -0,0 +1,154 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Recipe, TimelineBackfill, TimelineEntry
+from users.models import Subscribe, User
+
+BATCH_SIZE = 1000
+
+
+def is_popular(author_id):
+    """Popular authors are read at request time instead of fanned out."""
+    return User.objects.filter(
+        pk=author_id,
+        subscribers_count__gt=settings.FEED_FANOUT_MAX_SUBSCRIBERS,
+    ).exists()
+
+
+def write_entries(entries, timeline_model=TimelineEntry):
+    total = 0
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return total
+        timeline_model.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+
+
+def fan_out(recipe):
+    """Push a new recipe into the timelines of its author's subscribers."""
+    if is_popular(recipe.author_id):
+        return
+    subscribers = Subscribe.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    write_entries(
+        TimelineEntry(user_id=user_id, recipe_id=recipe.pk)
+        for user_id in subscribers.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def backfill(user_ids, author_id):
+    """Copy all recipes of an author into the given timelines."""
+    if is_popular(author_id):
+        return
+    copy_recipes(user_ids, author_id)
+
+
+def copy_recipes(user_ids, author_id):
+    recipes = Recipe.objects.filter(
+        author_id=author_id
+    ).values_list('pk', flat=True)
+    write_entries(
+        TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+        for recipe_id in recipes.iterator(chunk_size=BATCH_SIZE)
+        for user_id in user_ids
+    )
+
+
+def remove(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def schedule_backfill(author_id):
+    """Defer copying the author's recipes into all subscriber timelines.
+
+    Until `backfill_timelines` runs, the feed reads the author's recipes
+    on request, as for popular authors.
+    """
+    TimelineBackfill.objects.bulk_create(
+        (TimelineBackfill(author_id=author_id),), ignore_conflicts=True
+    )
+
+
+def run_backfills():
+    """Fill the timelines of every author scheduled for a backfill."""
+    done = 0
+    for author_id in TimelineBackfill.objects.values_list(
+        'author_id', flat=True
+    ):
+        with transaction.atomic():
+            subscribers = list(
+                Subscribe.objects.filter(
+                    author_id=author_id
+                ).values_list('user_id', flat=True)
+            )
+            if len(subscribers) <= settings.FEED_FANOUT_MAX_SUBSCRIBERS:
+                copy_recipes(subscribers, author_id)
+            TimelineBackfill.objects.filter(author_id=author_id).delete()
+        done += 1
+    return done
+
+
+def fill_timelines(timeline_model, subscribe_model, threshold):
+    """Build the timelines of all subscriptions from scratch."""
+    rows = subscribe_model.objects.filter(
+        author__subscribers_count__lte=threshold,
+        author__recipes__isnull=False,
+    ).values_list('user_id', 'author__recipes').order_by()
+    return write_entries(
+        (
+            timeline_model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in rows.iterator(chunk_size=BATCH_SIZE)
+        ),
+        timeline_model,
+    )
+
+
+def get_feed_ids(user, before=None, limit=10):
+    """Ids of the newest recipes of followed authors, newest first.
+
+    Pre-built timeline entries are merged with the recipes of popular
+    authors, which are not fanned out on write, and of authors whose
+    timelines still wait for `backfill_timelines`. `before` is the keyset
+    cursor: only recipes with a smaller id are returned.
+    """
+    timeline = TimelineEntry.objects.filter(user=user)
+    if before is not None:
+        timeline = timeline.filter(recipe_id__lt=before)
+    sources = [
+        timeline.order_by('-recipe_id').values_list(
+            'recipe_id', flat=True
+        )[:limit]
+    ]
+    popular = list(
+        Subscribe.objects.filter(
+            Q(author__subscribers_count__gt=(
+                settings.FEED_FANOUT_MAX_SUBSCRIBERS
+            ))
+            | Q(author__timeline_backfill__isnull=False),
+            user=user,
+        ).values_list('author_id', flat=True)
+    )
+    if popular:
+        recipes = Recipe.objects.filter(author_id__in=popular)
+        if before is not None:
+            recipes = recipes.filter(pk__lt=before)
+        sources.append(
+            recipes.order_by('-pk').values_list('pk', flat=True)[:limit]
+        )
+    ids = []
+    for recipe_id in merge(*sources, reverse=True):
+        if ids and ids[-1] == recipe_id:
+            continue
+        ids.append(recipe_id)
+        if len(ids) == limit:
+            break
+    return ids
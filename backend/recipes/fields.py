@@ -0,0 +1,55 @@
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+
+class RecipeImageField(Base64ImageField):
+    """Image given either as a base64 string or as a multipart file.
+
+    Multipart files arrive already spooled to disk by the upload handlers.
+    The byte size and the pixel count from the image header are checked
+    before Pillow decodes anything.
+    """
+
+    def __init__(self, **kwargs):
+        self.max_size = kwargs.pop('max_size', settings.RECIPE_IMAGE_MAX_SIZE)
+        self.max_pixels = kwargs.pop(
+            'max_pixels', settings.RECIPE_IMAGE_MAX_PIXELS
+        )
+        super().__init__(**kwargs)
+
+    def check_size(self, size):
+        if size > self.max_size:
+            raise serializers.ValidationError(
+                f'Размер картинки не должен превышать {self.max_size} байт!'
+            )
+
+    def check_pixels(self, file):
+        try:
+            width, height = Image.open(file).size
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        if width * height > self.max_pixels:
+            raise serializers.ValidationError(
+                f'Картинка не должна быть больше {self.max_pixels} пикселей!'
+            )
+
+    def get_file_extension(self, filename, decoded_file):
+        self.check_pixels(io.BytesIO(decoded_file))
+        return super().get_file_extension(filename, decoded_file)
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            self.check_size(data.size)
+            self.check_pixels(data)
+            return serializers.ImageField.to_internal_value(self, data)
+        if isinstance(data, str):
+            payload = data.rpartition(';base64,')[2]
+            self.check_size(len(payload) * 3 // 4)
+        return super().to_internal_value(data)
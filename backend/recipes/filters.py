@@ -1,12 +1,28 @@
-from django.db.models import IntegerField, Value
+from django.db.models import Exists, F, OuterRef
 from django_filters.rest_framework import (
-    AllValuesMultipleFilter,
     BooleanFilter,
     CharFilter,
-    FilterSet
+    ChoiceFilter,
+    FilterSet,
+    MultipleChoiceFilter
 )
 
-from .models import Ingredient, Recipe, ShoppingCart
+from .cache import get_tag_choices, get_tag_ids
+from .models import Favorite, Ingredient, Recipe, ShoppingCart
+from .search import search_queryset
+
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+TAGS_MATCH_CHOICES = (
+    (TAGS_MATCH_ANY, 'Любой из тегов'),
+    (TAGS_MATCH_ALL, 'Все теги'),
+)
+ORDERING_POPULAR = 'popular'
+ORDERING_TRENDING = 'trending'
+ORDERING_CHOICES = (
+    (ORDERING_POPULAR, 'Популярные'),
+    (ORDERING_TRENDING, 'В тренде'),
+)
 
 
 class IngredientSearchFilter(FilterSet):
@@ -19,47 +35,66 @@ class IngredientSearchFilter(FilterSet):
     def search_by_name(self, queryset, name, value):
         if not value:
             return queryset
-        start_with_queryset = (
-            queryset.filter(name__istartswith=value).annotate(
-                order=Value(0, IntegerField())
-            )
-        )
-        contain_queryset = (
-            queryset.filter(name__icontains=value).exclude(
-                pk__in=(ingredient.pk for ingredient in start_with_queryset)
-            ).annotate(
-                order=Value(1, IntegerField())
-            )
-        )
-        return start_with_queryset.union(contain_queryset).order_by('order')
+        return search_queryset(queryset, value)
 
 
 class RecipeFilter(FilterSet):
     is_favorited = BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    tags = MultipleChoiceFilter(choices=get_tag_choices, method='get_tags')
+    tags_match = ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES, method='get_tags_match'
+    )
+    ordering = ChoiceFilter(choices=ORDERING_CHOICES, method='get_ordering')
 
     class Meta:
         model = Recipe
         fields = ('author',)
 
-    def get_is_favorited(self, queryset, name, value):
-        if not value:
+    def get_tags(self, queryset, name, value):
+        tag_ids = get_tag_ids()
+        through = Recipe.tags.through.objects.filter(recipe=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL:
+            for slug in set(value):
+                queryset = queryset.filter(
+                    Exists(through.filter(tag_id=tag_ids[slug]))
+                )
             return queryset
-        favorites = self.request.user.favorites.all()
-        return queryset.filter(
-            pk__in=(favorite.recipe.pk for favorite in favorites)
+        return queryset.filter(Exists(through.filter(
+            tag_id__in=[tag_ids[slug] for slug in value]
+        )))
+
+    def get_tags_match(self, queryset, name, value):
+        return queryset
+
+    def get_ordering(self, queryset, name, value):
+        if value == ORDERING_POPULAR:
+            return queryset.order_by('-favorites_count', '-pk')
+        # Recipes without recent activity have no ranking row and go last.
+        return queryset.order_by(
+            F('ranking__trending').desc(nulls_last=True), '-pk'
+        )
+
+    def filter_by_exists(self, queryset, value, subquery):
+        exists = Exists(subquery.filter(recipe=OuterRef('pk')))
+        return queryset.filter(exists if value else ~exists)
+
+    def get_is_favorited(self, queryset, name, value):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        return self.filter_by_exists(
+            queryset, value, Favorite.objects.filter(user=user)
         )
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if not value:
-            return queryset
-        try:
-            recipes = (
-                self.request.user.shopping_cart.recipes.all()
-            )
-        except ShoppingCart.DoesNotExist:
-            return queryset
-        return queryset.filter(
-            pk__in=(recipe.pk for recipe in recipes)
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        return self.filter_by_exists(
+            queryset,
+            value,
+            ShoppingCart.recipes.through.objects.filter(
+                shoppingcart__user=user
+            ),
         )
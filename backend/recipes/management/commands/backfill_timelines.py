@@ -0,0 +1,20 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.feed import run_backfills
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет ленты подписчиков авторов, которые перестали быть '
+        'популярными. Запускается по расписанию, например раз в минуту.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        authors = run_backfills()
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнены ленты подписчиков авторов: {authors} '
+            f'за {perf_counter() - started:.2f} с.'
+        ))
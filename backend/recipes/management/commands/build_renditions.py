@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.renditions import SOURCE, build_renditions
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-версии для картинок рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать миниатюры, даже если они уже есть.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        built = failed = 0
+        recipes = Recipe.objects.exclude(image='').only(
+            'pk', 'image', 'renditions',
+        ).order_by('pk')
+        for recipe in recipes.iterator(chunk_size=options['batch_size']):
+            if (
+                not options['force']
+                and recipe.renditions.get(SOURCE) == recipe.image.name
+            ):
+                continue
+            try:
+                build_renditions(recipe)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {built}, ошибок: {failed} '
+            f'за {perf_counter() - started:.2f} с.'
+        ))
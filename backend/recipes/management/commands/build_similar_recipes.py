@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_index, count_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит индекс похожих рецептов по ингредиентам и тегам. '
+        'Запускается по расписанию: изменённые после сборки рецепты '
+        'учитываются отдельно до следующего запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-stale',
+            action='store_true',
+            help=(
+                'Строить, только если изменённых после сборки рецептов '
+                'больше SIMILAR_RECIPES_MAX_STALE.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['if_stale']:
+            stale = count_stale()
+            if stale <= settings.SIMILAR_RECIPES_MAX_STALE:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Изменённых после сборки рецептов: {stale}, '
+                    f'сборка не нужна.'
+                ))
+                return
+        started = perf_counter()
+        result = build_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'В индексе рецептов: {result["recipes"]}, '
+            f'признаков: {result["features"]}, '
+            f'ненулевых значений: {result["values"]} '
+            f'за {perf_counter() - started:.2f} с.'
+        ))
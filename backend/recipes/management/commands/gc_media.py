@@ -0,0 +1,85 @@
+import posixpath
+from datetime import timedelta
+from itertools import islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+
+def walk(storage, directory=''):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни один рецепт.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+
+    def get_referenced(self, batch_size):
+        referenced = set()
+        rows = Recipe.objects.values_list('image', 'renditions').order_by()
+        for image, renditions in rows.iterator(chunk_size=batch_size):
+            referenced.add(image)
+            referenced.update(renditions.values())
+        return referenced
+
+    def get_orphans(self, storage, referenced, min_age):
+        threshold = timezone.now() - timedelta(seconds=min_age)
+        for name in walk(storage):
+            self.scanned += 1
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > threshold:
+                continue
+            yield name
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        storage = Recipe._meta.get_field('image').storage
+        referenced = self.get_referenced(options['batch_size'])
+        self.scanned = removed = freed = 0
+        orphans = self.get_orphans(storage, referenced, options['min_age'])
+        while True:
+            batch = list(islice(orphans, options['batch_size']))
+            if not batch:
+                break
+            # Skip images that a recipe started to use during the scan.
+            batch = sorted(set(batch).difference(
+                Recipe.objects.filter(image__in=batch).values_list(
+                    'image', flat=True
+                )
+            ))
+            for name in batch:
+                freed += storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    storage.delete(name)
+            removed += len(batch)
+        elapsed = perf_counter() - started
+        action = 'будет удалено' if options['dry_run'] else 'удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Просмотрено файлов: {self.scanned}, {action}: '
+            f'{removed} ({freed / 1024 / 1024:.1f} МБ) за {elapsed:.2f} с '
+            f'({self.scanned / elapsed if elapsed else self.scanned:.0f} '
+            f'файлов/с).'
+        ))
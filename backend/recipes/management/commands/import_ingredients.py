@@ -0,0 +1,105 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import INGREDIENTS, invalidate
+from recipes.models import Ingredient
+from recipes.search import invalidate_index
+
+FIXTURE_MODEL = 'recipes.ingredient'
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def read_json_items(file):
+    """Yield the items of a top-level JSON array without loading it all."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON обрывается.')
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_json(file):
+    for item in read_json_items(file):
+        if 'fields' in item:
+            if item.get('model') != FIXTURE_MODEL:
+                continue
+            item = item['fields']
+        yield item['name'], item.get('measurement_unit', '')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON пакетами без дубликатов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--format', choices=READERS, default=None)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден.')
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError('Укажите формат: --format csv|json.')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше 0.')
+        started = perf_counter()
+        total = 0
+        count_before = Ingredient.objects.count()
+        with path.open(encoding='utf-8') as file, transaction.atomic():
+            rows = (
+                Ingredient(
+                    name=name.strip(),
+                    measurement_unit=measurement_unit.strip(),
+                )
+                for name, measurement_unit in READERS[file_format](file)
+            )
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+        created = Ingredient.objects.count() - count_before
+        invalidate_index()
+        invalidate(INGREDIENTS)
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {total}, добавлено: {created}, '
+            f'пропущено: {total - created} за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} строк/с).'
+        ))
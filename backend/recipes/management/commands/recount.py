@@ -0,0 +1,21 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe
+from users.models import Subscribe, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного, рецептов и подписчиков.'
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        with transaction.atomic():
+            recipes, users = recount(Recipe, User, Favorite, Subscribe)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, пользователей: {users} '
+            f'за {perf_counter() - started:.2f} с.'
+        ))
@@ -0,0 +1,22 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг трендов по событиям избранного и списка '
+        'покупок. Запускается по расписанию, например раз в 10 минут.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        result = refresh_rankings()
+        self.stdout.write(self.style.SUCCESS(
+            f'В рейтинге рецептов: {result["ranked"]}, '
+            f'удалено из рейтинга: {result["removed"]}, '
+            f'удалено старых событий: {result["pruned"]} '
+            f'за {perf_counter() - started:.2f} с.'
+        ))
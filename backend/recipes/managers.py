@@ -0,0 +1,29 @@
+from django.db.models import F, Manager, Window
+from django.db.models.functions import RowNumber
+
+
+class RecipeManager(Manager):
+    def latest_by_author(self, author_ids, limit=None):
+        """Latest `limit` recipes of every author in a single query."""
+        if not author_ids:
+            return []
+        queryset = self.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pk').desc(),
+            )
+        ).values(
+            'pk', 'author_id', 'name', 'image', 'renditions', 'cooking_time',
+            'row_number',
+        ).order_by()
+        sql, params = queryset.query.sql_with_params()
+        if limit is None:
+            return self.raw(
+                f'SELECT * FROM ({sql}) ranked ORDER BY id DESC', params
+            )
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE row_number <= %s '
+            'ORDER BY id DESC',
+            params + (limit,),
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:32
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='countofingredient',
+            name='amount',
+            field=models.DecimalField(decimal_places=1, max_digits=6, validators=[django.core.validators.MinValueValidator(0.1, message='Количество ингредиента должно быть больше 0!')], verbose_name='Количество'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+BATCH_SIZE = 1000
+
+
+def copy_to_recipe_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    through = Recipe._meta.get_field('ingredients').remote_field.through
+    rows = through.objects.values(
+        'recipe_id', 'countofingredient__ingredient_id',
+    ).annotate(
+        amount=Sum('countofingredient__amount'),
+    ).order_by().iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for row in rows:
+        batch.append(RecipeIngredient(
+            recipe_id=row['recipe_id'],
+            ingredient_id=row['countofingredient__ingredient_id'],
+            amount=row['amount'],
+        ))
+        if len(batch) == BATCH_SIZE:
+            RecipeIngredient.objects.bulk_create(batch)
+            batch = []
+    RecipeIngredient.objects.bulk_create(batch)
+
+
+def copy_to_count_of_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    CountOfIngredient = apps.get_model('recipes', 'CountOfIngredient')
+    through = Recipe._meta.get_field('ingredients').remote_field.through
+    for row in RecipeIngredient.objects.iterator(chunk_size=BATCH_SIZE):
+        count_of_ingredient, _ = CountOfIngredient.objects.get_or_create(
+            ingredient_id=row.ingredient_id,
+            amount=row.amount,
+        )
+        through.objects.get_or_create(
+            recipe_id=row.recipe_id,
+            countofingredient=count_of_ingredient,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_unique_name_measurement_unit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=1, max_digits=6, validators=[django.core.validators.MinValueValidator(0.1, message='Количество ингредиента должно быть больше 0!')], verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_ingredients', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Количество ингредиента',
+                'verbose_name_plural': 'Количество ингредиентов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.RunPython(
+            copy_to_recipe_ingredients, copy_to_count_of_ingredients
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.DeleteModel(
+            name='CountOfIngredient',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recipes', through='recipes.RecipeIngredient', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:45
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentHashStorage(), upload_to='', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def fill(apps, schema_editor):
+    TimelineEntry = apps.get_model('recipes', 'TimelineEntry')
+    Subscribe = apps.get_model('users', 'Subscribe')
+    rows = Subscribe.objects.filter(
+        author__subscribers_count__lte=(
+            settings.FEED_FANOUT_MAX_SUBSCRIBERS
+        ),
+        author__recipes__isnull=False,
+    ).values_list('user_id', 'author__recipes').order_by()
+    batch = []
+    for user_id, recipe_id in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(TimelineEntry(user_id=user_id, recipe_id=recipe_id))
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_hot_path_indexes'),
+        ('users', '0003_subscribe_author_user_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_user_recipe'),
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
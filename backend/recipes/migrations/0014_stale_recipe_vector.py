@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleRecipeVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.PositiveIntegerField(verbose_name='ID рецепта')),
+            ],
+            options={
+                'verbose_name': 'Устаревший вектор рецепта',
+                'verbose_name_plural': 'Устаревшие векторы рецептов',
+            },
+        ),
+    ]
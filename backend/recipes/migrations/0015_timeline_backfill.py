@@ -0,0 +1,25 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_subscribe_author_user_index'),
+        ('recipes', '0014_stale_recipe_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineBackfill',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timeline_backfill', serialize=False, to='users.user', verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Отложенное заполнение лент',
+                'verbose_name_plural': 'Отложенные заполнения лент',
+            },
+        ),
+    ]
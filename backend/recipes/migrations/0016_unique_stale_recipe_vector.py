@@ -0,0 +1,32 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicates(apps, schema_editor):
+    StaleRecipeVector = apps.get_model('recipes', 'StaleRecipeVector')
+    last_marks = StaleRecipeVector.objects.values('recipe_id').annotate(
+        last=Max('pk')
+    ).values('last')
+    StaleRecipeVector.objects.exclude(pk__in=last_marks).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_timeline_backfill'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='stalerecipevector',
+            name='marked',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Отмечен'),
+        ),
+        migrations.AlterField(
+            model_name='stalerecipevector',
+            name='recipe_id',
+            field=models.BigIntegerField(unique=True, verbose_name='ID рецепта'),
+        ),
+    ]
@@ -1,6 +1,58 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.status import HTTP_200_OK
 from rest_framework.viewsets import GenericViewSet
 
+from .cache import get_response_key, get_version
+
 
 class ListRetriveViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
     pass
+
+
+class CachedResponseMixin:
+    """Serve rendered GET responses from the cache.
+
+    Entries are keyed by the version of `cache_group`, which the model
+    signals bump on every change, and carry `ETag`/`Last-Modified` so
+    clients holding the current version get `304 Not Modified`.
+    """
+    cache_group = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super().dispatch(request, *args, **kwargs)
+        version = get_version(self.cache_group)
+        key = get_response_key(self.cache_group, version, request)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != HTTP_200_OK:
+                return response
+            response.render()
+            cached = (
+                response.content,
+                response['Content-Type'],
+                quote_etag(md5(response.content).hexdigest()),
+            )
+            cache.set(key, cached, settings.REFERENCE_CACHE_TIMEOUT)
+        else:
+            response = HttpResponse(cached[0], content_type=cached[1])
+        content, _, etag = cached
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        patch_vary_headers(response, ('Accept',))
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(
+            request, etag=etag, last_modified=int(version), response=response
+        ) or response
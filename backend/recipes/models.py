@@ -1,14 +1,17 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from .constants import COOKING_MIN_TIME, MIN_AMOUNT_INGREDIENT
+from .managers import RecipeManager
+from .storage import ContentHashStorage
 from users.models import User
 
 
 class Tag(models.Model):
     name = models.CharField('Название', max_length=30)
     color = models.CharField('Цвет', max_length=7)
-    slug = models.SlugField(max_length=30)
+    slug = models.SlugField(max_length=30, unique=True)
 
     class Meta:
         verbose_name = 'Тег'
@@ -26,43 +29,15 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
-
-    def __str__(self):
-        return self.name
-
-
-class CountOfIngredient(models.Model):
-    ingredient = models.ForeignKey(
-        Ingredient,
-        on_delete=models.CASCADE,
-        verbose_name='Ингредиент'
-    )
-    amount = models.DecimalField(
-        'Количество',
-        max_decimal_places=1,
-        validators=(
-            MinValueValidator(
-                MIN_AMOUNT_INGREDIENT,
-                message='Количество ингредиента должно быть больше 0!'
-            ),
-        ),
-    )
-
-    class Meta:
-        verbose_name = 'Количество ингредиента'
-        verbose_name_plural = 'Количество ингредиентов'
         constraints = (
             models.UniqueConstraint(
-                fields=('ingredient', 'amount',),
-                name='unique_ingredient_amount',
+                fields=('name', 'measurement_unit',),
+                name='unique_ingredient_measurement_unit',
             ),
         )
 
     def __str__(self):
-        return (
-            f'{self.ingredient.name} - {self.amount}'
-            f' ({self.ingredient.measurement_unit})'
-        )
+        return self.name
 
 
 class Recipe(models.Model):
@@ -70,13 +45,15 @@ class Recipe(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
-        verbose_name='Автор рецепта'
+        verbose_name='Автор рецепта',
+        db_index=False,
     )
     name = models.CharField('Название', max_length=200)
-    image = models.ImageField('Картинка')
+    image = models.ImageField('Картинка', storage=ContentHashStorage())
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
-        CountOfIngredient,
+        Ingredient,
+        through='RecipeIngredient',
         related_name='recipes',
         verbose_name='Ингредиенты'
     )
@@ -96,15 +73,76 @@ class Recipe(models.Model):
         )
     )
 
+    renditions = models.JSONField(
+        'Миниатюры', default=dict, blank=True, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное', default=0, editable=False
+    )
+
+    objects = RecipeManager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pk',)
+        indexes = (
+            models.Index(
+                fields=('-favorites_count', '-id',),
+                name='recipe_favorites_count_idx',
+            ),
+            models.Index(
+                fields=('author', '-id',),
+                name='recipe_author_id_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name} ({self.author})'
 
 
+class RecipeIngredient(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Рецепт'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='recipe_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.DecimalField(
+        'Количество',
+        max_digits=6,
+        decimal_places=1,
+        validators=(
+            MinValueValidator(
+                MIN_AMOUNT_INGREDIENT,
+                message='Количество ингредиента должно быть больше 0!'
+            ),
+        ),
+    )
+
+    class Meta:
+        verbose_name = 'Количество ингредиента'
+        verbose_name_plural = 'Количество ингредиентов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient',),
+                name='unique_recipe_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return (
+            f'{self.ingredient.name} - {self.amount}'
+            f' ({self.ingredient.measurement_unit})'
+        )
+
+
 class ShoppingCart(models.Model):
     user = models.OneToOneField(
         User,
@@ -152,3 +190,113 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user} -> {self.recipe}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+        db_index=False,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe',),
+                name='unique_timeline_user_recipe',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} <- {self.recipe}'
+
+
+class TimelineBackfill(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline_backfill',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Отложенное заполнение лент'
+        verbose_name_plural = 'Отложенные заполнения лент'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class RecipeEvent(models.Model):
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    KINDS = (
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name='Рецепт',
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    delta = models.SmallIntegerField('Изменение')
+    created = models.DateTimeField(
+        'Время', default=timezone.now, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Событие рецепта'
+        verbose_name_plural = 'События рецептов'
+
+    def __str__(self):
+        return f'{self.recipe} {self.kind} {self.delta:+d}'
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт',
+    )
+    trending = models.FloatField('Рейтинг трендов')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = (
+            models.Index(
+                fields=('-trending', '-recipe',),
+                name='ranking_trending_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe}: {self.trending:.2f}'
+
+
+class StaleRecipeVector(models.Model):
+    recipe_id = models.BigIntegerField('ID рецепта', unique=True)
+    marked = models.DateTimeField('Отмечен', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Устаревший вектор рецепта'
+        verbose_name_plural = 'Устаревшие векторы рецептов'
+
+    def __str__(self):
+        return str(self.recipe_id)
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Recipe, RecipeEvent, RecipeRanking
+
+BATCH_SIZE = 1000
+WEIGHTS = {
+    RecipeEvent.FAVORITE: 1.0,
+    RecipeEvent.SHOPPING_CART: 0.5,
+}
+
+
+def write_events(kind, recipe_ids, delta, created):
+    recipe_ids = Recipe.objects.filter(
+        pk__in=recipe_ids
+    ).values_list('pk', flat=True)
+    try:
+        with transaction.atomic():
+            RecipeEvent.objects.bulk_create(
+                RecipeEvent(
+                    recipe_id=recipe_id,
+                    kind=kind,
+                    delta=delta,
+                    created=created,
+                )
+                for recipe_id in recipe_ids
+            )
+    except IntegrityError:
+        # A recipe was deleted between the check and the insert.
+        pass
+
+
+def log_events(kind, recipe_ids, delta=1):
+    """Record activity once the surrounding transaction commits.
+
+    Deleting a recipe deletes its favorites and cart rows first, so events
+    are written only for recipes that still exist after the commit.
+    """
+    recipe_ids, created = tuple(recipe_ids), timezone.now()
+    transaction.on_commit(
+        lambda: write_events(kind, recipe_ids, delta, created)
+    )
+
+
+def trending_scores(now):
+    """Decayed favorite and shopping cart activity per recipe.
+
+    Every event in the window counts with the weight of its kind and loses
+    half of it per half-life, so a day-old favorite is worth half of a
+    fresh one and events older than the window are not counted at all.
+    """
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    events = RecipeEvent.objects.filter(
+        created__gte=now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    ).values_list('recipe_id', 'kind', 'delta', 'created')
+    scores = defaultdict(float)
+    for recipe_id, kind, delta, created in events.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        scores[recipe_id] += (
+            WEIGHTS[kind] * delta * 0.5 ** ((now - created) / half_life)
+        )
+    scores = {
+        recipe_id: round(score, 6) for recipe_id, score in scores.items()
+    }
+    return {
+        recipe_id: score for recipe_id, score in scores.items() if score > 0
+    }
+
+
+@transaction.atomic
+def refresh_rankings(now=None):
+    """Bring the ranking table in line with the current event window.
+
+    Events that left the window are pruned, so the work is proportional
+    to the recent activity; only rows whose score changed are written.
+    """
+    now = now or timezone.now()
+    pruned, _ = RecipeEvent.objects.filter(
+        created__lt=now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    ).delete()
+    scores = trending_scores(now)
+    current = dict(
+        RecipeRanking.objects.values_list('recipe_id', 'trending')
+    )
+    stale = current.keys() - scores.keys()
+    RecipeRanking.objects.filter(recipe_id__in=stale).delete()
+    RecipeRanking.objects.bulk_update(
+        (
+            RecipeRanking(recipe_id=recipe_id, trending=score)
+            for recipe_id, score in scores.items()
+            if recipe_id in current and current[recipe_id] != score
+        ),
+        ('trending',),
+        batch_size=BATCH_SIZE,
+    )
+    RecipeRanking.objects.bulk_create(
+        (
+            RecipeRanking(recipe_id=recipe_id, trending=score)
+            for recipe_id, score in scores.items()
+            if recipe_id not in current
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    return {'ranked': len(scores), 'removed': len(stale), 'pruned': pruned}
@@ -0,0 +1,93 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+SOURCE = 'source'
+
+executor = None
+
+
+def get_renditions():
+    size = settings.RECIPE_THUMBNAIL_SIZE
+    return {
+        'thumbnail': (size, 'JPEG', 'jpg'),
+        'thumbnail_webp': (size, 'WEBP', 'webp'),
+        'webp': (None, 'WEBP', 'webp'),
+    }
+
+
+def render(image, size, image_format):
+    if size is not None:
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format, quality=settings.RECIPE_RENDITION_QUALITY
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def build_renditions(recipe):
+    """Render every rendition of the recipe image and store their names."""
+    storage = recipe.image.storage
+    stem = PurePosixPath(recipe.image.name).stem
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        renditions = {SOURCE: recipe.image.name}
+        for name, (size, image_format, extension) in (
+            get_renditions().items()
+        ):
+            renditions[name] = storage.save(
+                f'{RENDITIONS_DIR}/{stem}_{name}.{extension}',
+                render(image, size, image_format),
+            )
+    Recipe.objects.filter(pk=recipe.pk, image=recipe.image.name).update(
+        renditions=renditions
+    )
+    return renditions
+
+
+def build_renditions_by_id(recipe_id):
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is not None and recipe.image:
+            build_renditions(recipe)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры рецепта %s', recipe_id)
+
+
+def build_renditions_in_thread(recipe_id):
+    close_old_connections()
+    try:
+        build_renditions_by_id(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def submit(recipe_id):
+    global executor
+    if not settings.RECIPE_RENDITIONS_ASYNC:
+        build_renditions_by_id(recipe_id)
+        return
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_RENDITION_WORKERS,
+            thread_name_prefix='renditions',
+        )
+    executor.submit(build_renditions_in_thread, recipe_id)
+
+
+def schedule_renditions(recipe):
+    """Build renditions after the current transaction commits."""
+    if recipe.image and recipe.renditions.get(SOURCE) != recipe.image.name:
+        transaction.on_commit(lambda: submit(recipe.pk))
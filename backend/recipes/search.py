@@ -0,0 +1,119 @@
+from bisect import bisect_left
+from threading import Lock
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Value, When
+
+from .models import Ingredient
+
+INDEX_VERSION_KEY = 'recipes:ingredient-index-version'
+TRIGRAM_SIZE = 3
+
+
+def search_queryset(queryset, value):
+    """Prefix matches first, then substring matches, in one query."""
+    return queryset.filter(name__icontains=value).annotate(
+        order=Case(
+            When(name__istartswith=value, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('order', 'name')
+
+
+def get_trigrams(value):
+    return {
+        value[i:i + TRIGRAM_SIZE]
+        for i in range(len(value) - TRIGRAM_SIZE + 1)
+    }
+
+
+def invalidate_index():
+    cache.set(INDEX_VERSION_KEY, uuid4().hex, None)
+
+
+class IngredientIndex:
+    """Process-local prefix and trigram index over ingredient names.
+
+    The index is rebuilt lazily whenever the version stored in the cache
+    changes, so every worker picks up ingredient edits on its next lookup.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.names = []
+        self.ingredients = []
+        self.trigrams = {}
+        self.lock = Lock()
+
+    def build(self, version):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda ingredient: (ingredient.name.lower(), ingredient.pk),
+        )
+        names = [ingredient.name.lower() for ingredient in ingredients]
+        trigrams = {}
+        for position, name in enumerate(names):
+            for trigram in get_trigrams(name):
+                trigrams.setdefault(trigram, []).append(position)
+        self.names, self.ingredients, self.trigrams = (
+            names, ingredients, trigrams
+        )
+        self.version = version
+
+    def refresh(self):
+        version = cache.get(INDEX_VERSION_KEY)
+        if version is None:
+            version = uuid4().hex
+            if not cache.add(INDEX_VERSION_KEY, version, None):
+                version = cache.get(INDEX_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def get_substring_positions(self, value):
+        if len(value) < TRIGRAM_SIZE:
+            return range(len(self.names))
+        postings = sorted(
+            (
+                self.trigrams.get(trigram, ())
+                for trigram in get_trigrams(value)
+            ),
+            key=len,
+        )
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            positions.intersection_update(posting)
+        return sorted(positions)
+
+    def search(self, value, limit=None):
+        self.refresh()
+        value = value.lower()
+        names, ingredients = self.names, self.ingredients
+        start = bisect_left(names, value)
+        end = start
+        while end < len(names) and names[end].startswith(value):
+            end += 1
+        results = ingredients[start:end]
+        if limit is not None and len(results) >= limit:
+            return results[:limit]
+        for position in self.get_substring_positions(value):
+            if start <= position < end or value not in names[position]:
+                continue
+            results.append(ingredients[position])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+ingredient_index = IngredientIndex()
+
+
+def autocomplete(value, limit=None):
+    if settings.INGREDIENT_SEARCH_BACKEND == 'database':
+        queryset = search_queryset(Ingredient.objects.all(), value)
+        return list(queryset[:limit] if limit is not None else queryset)
+    return ingredient_index.search(value, limit)
@@ -1,9 +1,14 @@
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+import json
+
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.utils import html
 
+from .cache import FAVORITES, SHOPPING_CART, get_recipe_ids
 from .constants import COOKING_MIN_TIME, MIN_AMOUNT_INGREDIENT
-from .models import CountOfIngredient, Ingredient, Recipe, ShoppingCart, Tag
+from .fields import RecipeImageField
+from .models import Ingredient, Recipe, RecipeIngredient, Tag
+from common.serializers import RenditionsField
 from users.serializers import UserSerializer
 
 
@@ -21,11 +26,24 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit',)
 
 
+class LimitSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1)
+
+
+class FeedSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    before = serializers.IntegerField(min_value=1, required=False)
+
+
+class SimilarSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(source='ingredient.id')
 
     class Meta:
-        model = CountOfIngredient
+        model = RecipeIngredient
         fields = ('id', 'amount',)
 
 
@@ -37,54 +55,42 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        model = CountOfIngredient
+        model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount',)
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer()
-    ingredients = RecipeIngredientReadSerializer(many=True)
+    ingredients = RecipeIngredientReadSerializer(
+        source='recipe_ingredients', many=True
+    )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'name', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'image', 'image_renditions', 'text',
+            'cooking_time',
         )
 
-    def get_user(self):
-        return self.context['request'].user
-
     def get_is_favorited(self, obj):
-        user = self.get_user()
-        return (
-            user.is_authenticated
-            and user.favorites.filter(recipe=obj).exists()
-        )
+        return obj.pk in get_recipe_ids(self.context['request'], FAVORITES)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.get_user()
-        try:
-            return (user.is_authenticated
-                    and user.shopping_cart.recipes.filter(
-                        pk__in=(obj.pk,)
-                    ).exists())
-        except ShoppingCart.DoesNotExist:
-            return False
+        return obj.pk in get_recipe_ids(
+            self.context['request'], SHOPPING_CART
+        )
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientWriteSerializer(many=True)
-    tags = serializers.ListField(
-        child=serializers.SlugRelatedField(
-            slug_field='id',
-            queryset=Tag.objects.all(),
-        ),
-    )
-    image = Base64ImageField(max_length=None, use_url=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    image = RecipeImageField(max_length=None, use_url=True)
+    json_form_fields = ('ingredients', 'tags',)
 
     class Meta:
         model = Recipe
@@ -100,6 +106,25 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             }
         }
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
+    def parse_form_data(self, data):
+        """Multipart forms carry the nested fields as JSON strings."""
+        data = data.dict()
+        for field in self.json_form_fields:
+            if field not in data:
+                continue
+            try:
+                data[field] = json.loads(data[field])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {field: ['Ожидается JSON-строка!']}
+                )
+        return data
+
     def validate(self, attrs):
         if attrs['cooking_time'] < COOKING_MIN_TIME:
             raise serializers.ValidationError(
@@ -111,6 +136,13 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
         if len(attrs['tags']) > len(set(attrs['tags'])):
             raise serializers.ValidationError('Теги не должны повторяться!')
+        tags = Tag.objects.in_bulk(attrs['tags'])
+        missing = [pk for pk in attrs['tags'] if pk not in tags]
+        if missing:
+            raise serializers.ValidationError(
+                f'Теги не найдены: {", ".join(map(str, missing))}!'
+            )
+        attrs['tags'] = [tags[pk] for pk in attrs['tags']]
         if len(attrs['ingredients']) == 0:
             raise serializers.ValidationError(
                 'Ингредиенты не могут отсутствовать!'
@@ -126,25 +158,30 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Ингредиенты не должны повторяться!'
             )
+        ingredients = Ingredient.objects.in_bulk(id_ingredients)
+        missing = [pk for pk in id_ingredients if pk not in ingredients]
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, missing))}!'
+            )
         return attrs
 
     def add_ingredients_and_tags(self, instance, validated_data):
         ingredients, tags = (
             validated_data.pop('ingredients'), validated_data.pop('tags')
         )
-        for ingredient in ingredients:
-            count_of_ingredient, _ = CountOfIngredient.objects.get_or_create(
-                ingredient=get_object_or_404(
-                    Ingredient,
-                    pk=ingredient['ingredient']['id']
-                ),
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=instance,
+                ingredient_id=ingredient['ingredient']['id'],
                 amount=ingredient['amount'],
             )
-            instance.ingredients.add(count_of_ingredient)
-        for tag in tags:
-            instance.tags.add(tag)
+            for ingredient in ingredients
+        )
+        instance.tags.add(*tags)
         return instance
 
+    @transaction.atomic
     def create(self, validated_data):
         saved = {}
         saved['ingredients'] = validated_data.pop('ingredients')
@@ -152,8 +189,9 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         return self.add_ingredients_and_tags(recipe, saved)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
+        instance.recipe_ingredients.all().delete()
         instance.tags.clear()
         instance = self.add_ingredients_and_tags(instance, validated_data)
         return super().update(instance, validated_data)
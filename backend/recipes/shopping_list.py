@@ -0,0 +1,65 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Sum
+
+from .models import RecipeIngredient
+
+FILE_NAME = 'shopping_cart'
+CHUNK_SIZE = 500
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_ingredients_queryset(user):
+    return (
+        RecipeIngredient.objects.filter(recipe__in_shopping_cart__user=user)
+        .values_list('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total=Sum('amount'))
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def get_ingredients(user):
+    return get_ingredients_queryset(user).iterator(chunk_size=CHUNK_SIZE)
+
+
+def render_txt(ingredients):
+    yield 'Список необходимых продуктов:\n'
+    for i, (name, measurement_unit, total) in enumerate(ingredients, start=1):
+        yield f'{i}) {name}  — {total} {measurement_unit}\r\n'
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in ingredients:
+        yield writer.writerow(row)
+
+
+def render_json(ingredients):
+    separator = ''
+    yield '['
+    for name, measurement_unit, total in ingredients:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': total,
+            },
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        )
+        separator = ','
+    yield ']'
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+}
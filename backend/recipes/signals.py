@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import (
+    FAVORITES,
+    INGREDIENTS,
+    SHOPPING_CART,
+    TAGS,
+    invalidate,
+    invalidate_recipe_ids
+)
+from .feed import backfill, fan_out, remove, schedule_backfill
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeEvent,
+    ShoppingCart,
+    Tag
+)
+from .rankings import log_events
+from .renditions import schedule_renditions
+from .search import invalidate_index
+from .similarity import mark_stale
+from users.models import Subscribe, User
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    invalidate_index()
+    invalidate(INGREDIENTS)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    invalidate(TAGS)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(instance, created, **kwargs):
+    if created:
+        invalidate_recipe_ids(FAVORITES, (instance.user_id,))
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+        log_events(RecipeEvent.FAVORITE, (instance.recipe_id,))
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(instance, **kwargs):
+    invalidate_recipe_ids(FAVORITES, (instance.user_id,))
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+    log_events(RecipeEvent.FAVORITE, (instance.recipe_id,), delta=-1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    schedule_renditions(instance)
+    mark_stale((instance.pk,))
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
+        fan_out(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    mark_stale((instance.pk,))
+    User.objects.filter(
+        pk=instance.author_id, recipes_count__gt=0
+    ).update(recipes_count=F('recipes_count') - 1)
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribe_created(instance, created, **kwargs):
+    if created:
+        backfill((instance.user_id,), instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def subscribe_deleted(instance, **kwargs):
+    remove(instance.user_id, instance.author_id)
+    subscribers = Subscribe.objects.filter(
+        author_id=instance.author_id
+    ).count()
+    if subscribers == settings.FEED_FANOUT_MAX_SUBSCRIBERS:
+        # The author stops being popular: recipes published meanwhile
+        # were only read on request and are missing from the timelines.
+        schedule_backfill(instance.author_id)
+
+
+@receiver(m2m_changed, sender=ShoppingCart.recipes.through)
+def shopping_cart_changed(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        user_ids = ShoppingCart.objects.filter(
+            pk__in=pk_set or ()
+        ).values_list('user_id', flat=True)
+        invalidate_recipe_ids(SHOPPING_CART, user_ids)
+        return
+    invalidate_recipe_ids(SHOPPING_CART, (instance.user_id,))
+    if action == 'post_add':
+        log_events(RecipeEvent.SHOPPING_CART, pk_set)
+    elif action == 'post_remove':
+        log_events(RecipeEvent.SHOPPING_CART, pk_set, delta=-1)
@@ -0,0 +1,336 @@
+import logging
+import os
+import shutil
+from collections import namedtuple
+from itertools import chain
+from threading import Lock
+from uuid import uuid4
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Recipe, RecipeIngredient, StaleRecipeVector
+
+CURRENT = 'CURRENT'
+BATCH_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+Arrays = namedtuple('Arrays', (
+    'recipe_ids', 'ingredient_ids', 'tag_ids', 'idf', 'indptr', 'indices',
+    'data',
+))
+Overlay = namedtuple(
+    'Overlay', ('arrays', 'marks', 'recipe_ids', 'rows', 'matrix'),
+)
+
+
+def mark_stale(recipe_ids):
+    """Mark recipes as changed since the build, once per recipe.
+
+    Existing marks are moved forward, so a build that started before the
+    change does not clear them.
+    """
+    marked = timezone.now()
+    StaleRecipeVector.objects.filter(
+        recipe_id__in=recipe_ids
+    ).update(marked=marked)
+    StaleRecipeVector.objects.bulk_create(
+        (
+            StaleRecipeVector(recipe_id=recipe_id, marked=marked)
+            for recipe_id in recipe_ids
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def count_stale():
+    return StaleRecipeVector.objects.count()
+
+
+def get_pairs(queryset, fields):
+    """Rows of `queryset` as an `n×2` array of `(recipe_id, feature_id)`."""
+    values = queryset.values_list(*fields).order_by()
+    return np.fromiter(
+        chain.from_iterable(values.iterator(chunk_size=BATCH_SIZE)),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+
+def get_features(recipe_ids=None):
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    return (
+        get_pairs(ingredients, ('recipe_id', 'ingredient_id')),
+        get_pairs(tags, ('recipe_id', 'tag_id')),
+    )
+
+
+def lookup(keys, values):
+    """Positions of `values` in the sorted `keys`, -1 for missing ones."""
+    if not len(keys):
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return np.where(keys[positions] == values, positions, -1)
+
+
+def build_arrays():
+    """TF-IDF weighted recipe×feature matrix in compressed column form.
+
+    Ingredients and tags are binary features weighted by their smoothed
+    inverse document frequency, tags additionally by
+    `SIMILAR_RECIPES_TAG_WEIGHT`. Rows are L2-normalized, so a dot product
+    of two rows is their cosine similarity. Columns hold the postings of
+    one feature, which is all a query needs to read.
+    """
+    ingredients, tags = get_features()
+    owners = np.concatenate((ingredients[:, 0], tags[:, 0]))
+    recipe_ids = np.unique(owners)
+    ingredient_ids = np.unique(ingredients[:, 1])
+    tag_ids = np.unique(tags[:, 1])
+    rows = np.searchsorted(recipe_ids, owners)
+    cols = np.concatenate((
+        np.searchsorted(ingredient_ids, ingredients[:, 1]),
+        len(ingredient_ids) + np.searchsorted(tag_ids, tags[:, 1]),
+    ))
+    shape = (len(recipe_ids), len(ingredient_ids) + len(tag_ids))
+    idf = np.log(
+        (1 + shape[0]) / (1 + np.bincount(cols, minlength=shape[1]))
+    ) + 1
+    idf[len(ingredient_ids):] *= settings.SIMILAR_RECIPES_TAG_WEIGHT
+    values = idf[cols]
+    values /= np.sqrt(
+        np.bincount(rows, values ** 2, minlength=shape[0])
+    )[rows]
+    matrix = sparse.csc_matrix(
+        (values.astype(np.float32), (rows, cols)), shape=shape
+    )
+    return Arrays(
+        recipe_ids=recipe_ids,
+        ingredient_ids=ingredient_ids,
+        tag_ids=tag_ids,
+        idf=idf.astype(np.float32),
+        indptr=matrix.indptr.astype(np.int64),
+        indices=matrix.indices.astype(np.int32),
+        data=matrix.data,
+    )
+
+
+def save_arrays(arrays, directory):
+    """Write a new index version and point `CURRENT` at it atomically.
+
+    Older versions are removed; workers that still have their files
+    mapped keep reading them until they reopen the index.
+    """
+    version = uuid4().hex
+    path = directory / version
+    path.mkdir(parents=True)
+    for name, array in arrays._asdict().items():
+        np.save(path / f'{name}.npy', array)
+    pointer = directory / f'{CURRENT}.{version}'
+    pointer.write_text(version)
+    os.replace(pointer, directory / CURRENT)
+    for old in directory.iterdir():
+        if old.is_dir() and old.name != version:
+            shutil.rmtree(old, ignore_errors=True)
+    return version
+
+
+def build_index(directory=None):
+    """Rebuild the index from the database and clear the stale marks.
+
+    Marks set while the build runs are kept, since the build may have
+    read those recipes before they changed.
+    """
+    started = timezone.now()
+    arrays = build_arrays()
+    save_arrays(arrays, directory or settings.SIMILAR_RECIPES_DIR)
+    StaleRecipeVector.objects.filter(marked__lt=started).delete()
+    return {
+        'recipes': len(arrays.recipe_ids),
+        'features': len(arrays.idf),
+        'values': len(arrays.data),
+    }
+
+
+def get_vectors(arrays, recipe_ids):
+    """Vectors of recipes built from their current database rows.
+
+    Features missing from the index are dropped until the next build.
+    """
+    ingredients, tags = get_features(recipe_ids)
+    owners = np.concatenate((ingredients[:, 0], tags[:, 0]))
+    tag_cols = lookup(arrays.tag_ids, tags[:, 1])
+    cols = np.concatenate((
+        lookup(arrays.ingredient_ids, ingredients[:, 1]),
+        np.where(tag_cols >= 0, tag_cols + len(arrays.ingredient_ids), -1),
+    ))
+    owners, cols = owners[cols >= 0], cols[cols >= 0]
+    order = np.argsort(owners, kind='stable')
+    owners, cols = owners[order], cols[order]
+    ids, starts = np.unique(owners, return_index=True)
+    vectors = {}
+    for recipe_id, recipe_cols in zip(
+        ids.tolist(), np.split(cols, starts[1:])
+    ):
+        weights = arrays.idf[recipe_cols].astype(np.float64)
+        vectors[recipe_id] = (recipe_cols, weights / np.linalg.norm(weights))
+    return vectors
+
+
+class SimilarityIndex:
+    """Process-local view of the persisted recipe vectors.
+
+    The arrays are memory-mapped, so all workers share one copy through
+    the page cache. The index is reopened when a build publishes a new
+    version. Recipes changed since the build are marked stale: their rows
+    are ignored and they are scored against an overlay built from the
+    database, which is kept until the version or the marks change. Past
+    `SIMILAR_RECIPES_MAX_STALE` marks the index is served as built until
+    the next build.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.arrays = None
+        self.overlay = None
+        self.lock = Lock()
+
+    def load(self, version):
+        path = settings.SIMILAR_RECIPES_DIR / version
+        self.arrays = Arrays(**{
+            name: np.load(path / f'{name}.npy', mmap_mode='r')
+            for name in Arrays._fields
+        })
+        self.version = version
+
+    def refresh(self):
+        """Open the current version; return False if there is none."""
+        try:
+            version = (settings.SIMILAR_RECIPES_DIR / CURRENT).read_text()
+        except FileNotFoundError:
+            return self.arrays is not None
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    try:
+                        self.load(version)
+                    except FileNotFoundError:
+                        # Replaced by a newer build while being opened.
+                        pass
+        return self.arrays is not None
+
+    def build_overlay(self, arrays, marks):
+        """Stale recipes as a sparse matrix over the index features."""
+        recipe_ids = list(
+            StaleRecipeVector.objects.order_by('recipe_id').values_list(
+                'recipe_id', flat=True
+            )[:settings.SIMILAR_RECIPES_MAX_STALE + 1]
+        )
+        if len(recipe_ids) > settings.SIMILAR_RECIPES_MAX_STALE:
+            logger.warning(
+                'Изменено больше %s рецептов после сборки индекса похожих '
+                'рецептов, запустите build_similar_recipes',
+                settings.SIMILAR_RECIPES_MAX_STALE,
+            )
+            recipe_ids = []
+        vectors = get_vectors(arrays, recipe_ids)
+        ids = np.fromiter(vectors, dtype=np.int64, count=len(vectors))
+        cols = [recipe_cols for recipe_cols, _ in vectors.values()]
+        weights = [recipe_weights for _, recipe_weights in vectors.values()]
+        lengths = [len(recipe_cols) for recipe_cols in cols]
+        matrix = sparse.csr_matrix(
+            (
+                np.concatenate(weights) if weights else np.empty(0),
+                np.concatenate(cols) if cols else np.empty(0, np.int64),
+                np.concatenate(([0], np.cumsum(lengths))),
+            ),
+            shape=(len(ids), len(arrays.idf)),
+        )
+        rows = lookup(
+            arrays.recipe_ids, np.array(recipe_ids, dtype=np.int64)
+        )
+        return Overlay(
+            arrays=arrays,
+            marks=marks,
+            recipe_ids=ids,
+            rows=rows[rows >= 0],
+            matrix=matrix,
+        )
+
+    def is_current(self, overlay, arrays, marks):
+        return (
+            overlay is not None
+            and overlay.arrays is arrays
+            and overlay.marks == marks
+        )
+
+    def get_overlay(self, arrays):
+        """The overlay of the current marks, rebuilt when they change.
+
+        Marks are only added or moved forward between builds, so their
+        count and latest time identify the set.
+        """
+        marks = StaleRecipeVector.objects.aggregate(
+            count=Count('pk'), last=Max('marked')
+        )
+        overlay = self.overlay
+        if not self.is_current(overlay, arrays, marks):
+            with self.lock:
+                overlay = self.overlay
+                if not self.is_current(overlay, arrays, marks):
+                    overlay = self.build_overlay(arrays, marks)
+                    self.overlay = overlay
+        return overlay
+
+    def get_scores(self, arrays, cols, weights):
+        """Dot products of every indexed row with the query vector."""
+        rows, values = [], []
+        for col, weight in zip(cols.tolist(), weights.tolist()):
+            start, end = arrays.indptr[col], arrays.indptr[col + 1]
+            rows.append(arrays.indices[start:end])
+            values.append(arrays.data[start:end] * weight)
+        return np.bincount(
+            np.concatenate(rows),
+            np.concatenate(values),
+            minlength=len(arrays.recipe_ids),
+        )
+
+    def similar(self, recipe_id, limit):
+        """Ids of up to `limit` recipes closest to the given one."""
+        arrays = self.arrays
+        overlay = self.get_overlay(arrays)
+        vectors = get_vectors(arrays, (recipe_id,))
+        if recipe_id not in vectors:
+            return []
+        cols, weights = vectors[recipe_id]
+        scores = self.get_scores(arrays, cols, weights)
+        scores[overlay.rows] = 0
+        row = lookup(arrays.recipe_ids, np.array([recipe_id]))[0]
+        if row >= 0:
+            scores[row] = 0
+        query = np.zeros(len(arrays.idf))
+        query[cols] = weights
+        overlay_scores = overlay.matrix.dot(query)
+        overlay_scores[overlay.recipe_ids == recipe_id] = 0
+        ids = np.concatenate((arrays.recipe_ids, overlay.recipe_ids))
+        scores = np.concatenate((scores, overlay_scores))
+        if len(scores) > limit:
+            candidates = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        results = [
+            (float(scores[row]), int(ids[row]))
+            for row in candidates if scores[row] > 0
+        ]
+        results.sort(reverse=True)
+        return [other_id for _, other_id in results]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,463 @@
+import os
+import tempfile
+import time
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings
+)
+from rest_framework.test import APITestCase
+
+from .cache import FAVORITES, get_recipe_ids, get_user_recipes_version_key
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeEvent,
+    RecipeIngredient,
+    RecipeRanking,
+    ShoppingCart,
+    StaleRecipeVector,
+    Tag,
+    TimelineBackfill,
+    TimelineEntry
+)
+from .similarity import SimilarityIndex, build_index, mark_stale
+from .storage import ContentHashStorage
+from common.seeding import seed_dataset
+from users.models import Subscribe, User
+
+IMAGE = 'recipes/images/test.gif'
+
+
+def create_user(name):
+    return User.objects.create_user(
+        username=name,
+        email=f'{name}@example.com',
+        password='password',
+        first_name=name,
+        last_name=name,
+    )
+
+
+def create_recipes(author, count, tags, ingredients):
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author,
+            name=f'Рецепт {i}',
+            image=IMAGE,
+            text='Описание рецепта.',
+            cooking_time=10,
+        )
+        for i in range(count)
+    )
+    recipes = list(Recipe.objects.filter(author=author).order_by('pk'))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in tags
+    )
+    return recipes
+
+
+class RecipeQueriesTest(APITestCase):
+    """The recipe list and detail take a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        authors = [create_user(f'author{i}') for i in range(3)]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {i}', color=f'#00000{i}', slug=f'tag-{i}'
+            )
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(4)
+        ]
+        recipes = []
+        for author in authors:
+            recipes += create_recipes(author, 10, tags, ingredients)
+        cls.recipe = recipes[0]
+        Subscribe.objects.create(user=cls.user, author=authors[0])
+        for recipe in recipes[::3]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        cart = ShoppingCart.objects.create(user=cls.user)
+        cart.recipes.add(*recipes[::4])
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_queries(self, count, url):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        for limit in (2, 20):
+            with self.subTest(limit=limit):
+                response = self.assert_queries(
+                    5, f'/api/recipes/?limit={limit}'
+                )
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(self.user)
+        for limit in (2, 20):
+            with self.subTest(limit=limit):
+                cache.clear()
+                response = self.assert_queries(
+                    7, f'/api/recipes/?limit={limit}'
+                )
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authenticated_cached_flags(self):
+        # Favorite and cart ids are cached per user after the first page.
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/recipes/')
+        for limit in (2, 20):
+            with self.subTest(limit=limit):
+                self.assert_queries(5, f'/api/recipes/?limit={limit}')
+
+    def test_detail_anonymous(self):
+        self.assert_queries(4, f'/api/recipes/{self.recipe.pk}/')
+
+    def test_detail_authenticated(self):
+        self.client.force_authenticate(self.user)
+        response = self.assert_queries(
+            6, f'/api/recipes/{self.recipe.pk}/'
+        )
+        self.assertTrue(response.data['author']['is_subscribed'])
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql', 'EXPLAIN checks need PostgreSQL'
+)
+class QueryPlansTest(TestCase):
+    """Hot API queries use indexes on a medium-sized dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset('medium')
+
+    def test_no_seq_scans(self):
+        output = StringIO()
+        try:
+            call_command('check_query_plans', stdout=output)
+        except CommandError as error:
+            self.fail(f'{error}\n{output.getvalue()}')
+
+
+class RecipeEventsTest(APITestCase):
+    """Favorite and cart changes are logged without breaking deletes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe, cls.other = create_recipes(cls.author, 2, (), ())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_favorite_and_cart_are_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+            self.client.post(f'/api/recipes/{self.recipe.pk}/shopping_cart/')
+            self.client.delete(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(
+            sorted(RecipeEvent.objects.values_list('kind', 'delta')),
+            [
+                (RecipeEvent.FAVORITE, -1),
+                (RecipeEvent.FAVORITE, 1),
+                (RecipeEvent.SHOPPING_CART, 1),
+            ],
+        )
+
+    def test_delete_favorited_recipe(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user).recipes.add(self.recipe)
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(
+            RecipeEvent.objects.filter(recipe_id=self.recipe.pk).exists()
+        )
+
+    def test_delete_author_of_favorited_recipes(self):
+        Favorite.objects.create(user=self.user, recipe=self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.delete()
+        self.assertFalse(RecipeEvent.objects.exists())
+
+
+@override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=1)
+class FeedBackfillTest(APITestCase):
+    """An author who stops being popular is backfilled out of request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader, cls.other = create_user('reader'), create_user('other')
+        cls.recipes = create_recipes(cls.author, 3, (), ())
+
+    def setUp(self):
+        # The author is already popular, so nothing was fanned out.
+        Subscribe.objects.bulk_create((
+            Subscribe(user=self.reader, author=self.author),
+            Subscribe(user=self.other, author=self.author),
+        ))
+        User.objects.filter(pk=self.author.pk).update(subscribers_count=2)
+
+    def get_feed_ids(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_unsubscribe_schedules_backfill(self):
+        Subscribe.objects.filter(user=self.other).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertTrue(
+            TimelineBackfill.objects.filter(author=self.author).exists()
+        )
+        expected = [recipe.pk for recipe in reversed(self.recipes)]
+        self.assertEqual(self.get_feed_ids(), expected)
+        call_command('backfill_timelines', stdout=open(os.devnull, 'w'))
+        self.assertFalse(TimelineBackfill.objects.exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            len(self.recipes),
+        )
+        self.assertEqual(self.get_feed_ids(), expected)
+
+    def test_backfill_skips_author_popular_again(self):
+        Subscribe.objects.filter(user=self.other).delete()
+        Subscribe.objects.create(user=self.other, author=self.author)
+        call_command('backfill_timelines', stdout=open(os.devnull, 'w'))
+        self.assertFalse(TimelineBackfill.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+
+class FavoritesCounterTest(APITestCase):
+    """A favorite is not kept if its counter update fails."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.recipe, = create_recipes(create_user('author'), 1, (), ())
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/recipes/{self.recipe.pk}/favorite/'
+
+    def test_failed_counter_update_rolls_back_favorite(self):
+        with mock.patch.object(
+            QuerySet, 'update', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.post(self.url)
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_failed_counter_update_keeps_favorite(self):
+        self.client.post(self.url)
+        with mock.patch.object(
+            QuerySet, 'update', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.delete(self.url)
+        self.assertTrue(Favorite.objects.exists())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+
+class RecipeOrderingTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipes = create_recipes(author, 4, (), ())
+        RecipeRanking.objects.bulk_create((
+            RecipeRanking(recipe=cls.recipes[0], trending=0.5),
+            RecipeRanking(recipe=cls.recipes[3], trending=2.0),
+        ))
+
+    def get_ids(self, ordering):
+        response = self.client.get(f'/api/recipes/?ordering={ordering}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_trending_puts_unranked_recipes_last(self):
+        first, second, third, fourth = (
+            recipe.pk for recipe in self.recipes
+        )
+        self.assertEqual(
+            self.get_ids('trending'), [fourth, first, third, second]
+        )
+
+    def test_trending_without_rankings(self):
+        RecipeRanking.objects.all().delete()
+        self.assertEqual(len(self.get_ids('trending')), len(self.recipes))
+
+
+class UserRecipeIdsCacheTest(APITestCase):
+    """Cached favorite and cart ids follow every change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.recipe, = create_recipes(create_user('author'), 1, (), ())
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def get_flags(self):
+        data = self.client.get(f'/api/recipes/{self.recipe.pk}/').data
+        return data['is_favorited'], data['is_in_shopping_cart']
+
+    def test_flags_follow_changes(self):
+        url = f'/api/recipes/{self.recipe.pk}'
+        self.assertEqual(self.get_flags(), (False, False))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{url}/favorite/')
+            self.client.post(f'{url}/shopping_cart/')
+        self.assertEqual(self.get_flags(), (True, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'{url}/favorite/')
+        self.assertEqual(self.get_flags(), (False, True))
+
+    def get_favorite_ids(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return get_recipe_ids(request, FAVORITES)
+
+    def test_set_loaded_before_a_write_is_not_reused(self):
+        self.assertEqual(self.get_favorite_ids(), set())
+        version_key = get_user_recipes_version_key(FAVORITES, self.user.pk)
+        version = cache.get(version_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+        # A reader that loaded the set before the write stores it late.
+        cache.set(
+            f'recipes:{FAVORITES}:user:{self.user.pk}:{version}', frozenset()
+        )
+        self.assertNotEqual(cache.get(version_key), version)
+        self.assertEqual(self.get_favorite_ids(), {self.recipe.pk})
+
+
+class SimilarRecipesTest(APITestCase):
+    """Stale marks are kept once per recipe and the overlay is bounded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {i}', measurement_unit='г'
+            )
+            for i in range(3)
+        ]
+        cls.recipes = create_recipes(
+            create_user('author'), 3, (), ingredients
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_marks_are_unique(self):
+        ids = [recipe.pk for recipe in self.recipes]
+        mark_stale(ids)
+        mark_stale(ids[:1])
+        self.assertEqual(
+            sorted(StaleRecipeVector.objects.values_list(
+                'recipe_id', flat=True
+            )),
+            ids,
+        )
+        build_index(self.directory)
+        self.assertFalse(StaleRecipeVector.objects.exists())
+
+    @override_settings(SIMILAR_RECIPES_MAX_STALE=1)
+    def test_overlay_is_bounded(self):
+        build_index(self.directory)
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        index = SimilarityIndex()
+        with self.settings(SIMILAR_RECIPES_DIR=self.directory):
+            self.assertTrue(index.refresh())
+        mark_stale((second,))
+        self.assertEqual(sorted(index.similar(first, 10)), [second, third])
+        mark_stale((second, third))
+        with self.assertLogs('recipes.similarity', 'WARNING'):
+            self.assertEqual(
+                sorted(index.similar(first, 10)), [second, third]
+            )
+
+    def test_overlay_is_reused_until_marks_change(self):
+        build_index(self.directory)
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        index = SimilarityIndex()
+        with self.settings(SIMILAR_RECIPES_DIR=self.directory):
+            self.assertTrue(index.refresh())
+        mark_stale((second,))
+        index.similar(first, 10)
+        overlay = index.overlay
+        # The marks aggregate and the query recipe's features only.
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                sorted(index.similar(first, 10)), [second, third]
+            )
+        self.assertIs(index.overlay, overlay)
+        Recipe.tags.through.objects.bulk_create((
+            Recipe.tags.through(
+                recipe_id=third,
+                tag=Tag.objects.create(
+                    name='Тег', color='#000000', slug='tag'
+                ),
+            ),
+        ))
+        mark_stale((third,))
+        self.assertEqual(
+            sorted(index.similar(first, 10)), [second, third]
+        )
+        self.assertIsNot(index.overlay, overlay)
+
+
+class ContentHashStorageTest(SimpleTestCase):
+
+    def test_reused_file_looks_new_to_gc_media(self):
+        with tempfile.TemporaryDirectory() as location:
+            storage = ContentHashStorage(location=location)
+            name = storage.save('images/a.gif', ContentFile(b'gif'))
+            old = time.time() - 24 * 60 * 60
+            os.utime(storage.path(name), (old, old))
+            self.assertEqual(
+                storage.save('images/b.gif', ContentFile(b'gif')), name
+            )
+            self.assertGreater(
+                os.path.getmtime(storage.path(name)), old + 60
+            )
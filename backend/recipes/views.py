@@ -1,48 +1,83 @@
-from django.db import IntegrityError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework.backends import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_204_NO_CONTENT,
-    HTTP_400_BAD_REQUEST
+    HTTP_400_BAD_REQUEST,
+    HTTP_503_SERVICE_UNAVAILABLE
 )
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.viewsets import ModelViewSet
 
+from .cache import INGREDIENTS, TAGS
+from .feed import get_feed_ids
 from .filters import IngredientSearchFilter, RecipeFilter
-from .mixins import ListRetriveViewSet
-from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from .mixins import CachedResponseMixin, ListRetriveViewSet
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
 from .permissions import IsAuthorOrAdminOrReadOnly
+from .renderers import CSVRenderer, PlainTextRenderer
+from .search import autocomplete
 from .serializers import (
+    FeedSerializer,
     IngredientSerializer,
+    LimitSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
+    SimilarSerializer,
     TagSerializer
 )
+from .shopping_list import FILE_NAME, RENDERERS, get_ingredients
+from .similarity import similarity_index
 from common.pagination import LimitPageNumberPagination
 from common.serializers import RecipeShortReadSerializer
-
-FILE_NAME = 'shopping_cart.txt'
+from users.models import Subscribe, User
 
 
-class TagViewSet(ListRetriveViewSet):
+class TagViewSet(CachedResponseMixin, ListRetriveViewSet):
+    cache_group = TAGS
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     http_method_names = ('get',)
 
 
-class IngredientViewSet(ListRetriveViewSet):
+class IngredientViewSet(CachedResponseMixin, ListRetriveViewSet):
+    cache_group = INGREDIENTS
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientSearchFilter
     queryset = Ingredient.objects.all()
     http_method_names = ('get',)
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        if limit is not None:
+            serializer = LimitSerializer(data={'limit': limit})
+            serializer.is_valid(raise_exception=True)
+            limit = serializer.validated_data['limit']
+        serializer = self.get_serializer(
+            autocomplete(name, limit), many=True
+        )
+        return Response(serializer.data)
+
 
 class ShoppingCartViewSet(ModelViewSet):
     queryset = ShoppingCart.objects.all()
@@ -84,9 +119,37 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    parser_classes = (JSONParser, MultiPartParser, FormParser,)
     queryset = Recipe.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete',)
 
+    def get_queryset(self):
+        if self.request.method not in SAFE_METHODS:
+            return super().get_queryset()
+        return self.get_read_queryset()
+
+    def get_read_queryset(self):
+        user = self.request.user
+        if user.is_authenticated:
+            is_subscribed = Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef('pk'))
+            )
+        else:
+            is_subscribed = Value(False, output_field=BooleanField())
+        return Recipe.objects.prefetch_related(
+            'tags',
+            Prefetch(
+                'author',
+                queryset=User.objects.annotate(is_subscribed=is_subscribed),
+            ),
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
@@ -100,7 +163,7 @@ class RecipeViewSet(ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         serializer = RecipeReadSerializer(
-            instance=serializer.instance,
+            instance=self.get_read_queryset().get(pk=serializer.instance.pk),
             context={'request': self.request}
         )
         headers = self.get_success_headers(serializer.data)
@@ -117,7 +180,7 @@ class RecipeViewSet(ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         serializer = RecipeReadSerializer(
-            instance=serializer.instance,
+            instance=self.get_read_queryset().get(pk=serializer.instance.pk),
             context={'request': self.request},
         )
         return Response(
@@ -126,7 +189,10 @@ class RecipeViewSet(ModelViewSet):
 
     def _add_to_favorite(self, request, recipe):
         try:
-            Favorite.objects.create(user=request.user, recipe=recipe)
+            # The favorites counter is updated by a signal in the same
+            # transaction as the row.
+            with transaction.atomic():
+                Favorite.objects.create(user=request.user, recipe=recipe)
         except IntegrityError:
             return Response(
                 {'error': 'Уже в избранном!'},
@@ -145,7 +211,8 @@ class RecipeViewSet(ModelViewSet):
                 {'error': 'Избранного не существует!'},
                 status=HTTP_400_BAD_REQUEST,
             )
-        favorite.delete()
+        with transaction.atomic():
+            favorite.delete()
         return Response(status=HTTP_204_NO_CONTENT)
 
     @action(
@@ -159,42 +226,67 @@ class RecipeViewSet(ModelViewSet):
             return self._add_to_favorite(request, recipe)
         return self._delete_from_favorite(request, recipe)
 
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        params = FeedSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        limit = params.validated_data['limit']
+        ids = get_feed_ids(
+            request.user, params.validated_data.get('before'), limit + 1
+        )
+        next_url = None
+        if len(ids) > limit:
+            ids = ids[:limit]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'before', ids[-1]
+            )
+        serializer = RecipeReadSerializer(
+            self.get_read_queryset().filter(pk__in=ids).order_by('-pk'),
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        params = SimilarSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if not similarity_index.refresh():
+            return Response(
+                {'error': 'Индекс похожих рецептов ещё не построен!'},
+                status=HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        ids = similarity_index.similar(
+            recipe.pk, params.validated_data['limit']
+        )
+        recipes = Recipe.objects.in_bulk(ids)
+        serializer = RecipeShortReadSerializer(
+            [recipes[pk] for pk in ids if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
     @action(
         detail=False,
         queryset=ShoppingCart.objects.all(),
         serializer_class=RecipeShortReadSerializer,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer,),
     )
     def download_shopping_cart(self, request):
-        try:
-            recipes = (
-                request.user.shopping_cart.recipes.prefetch_related(
-                    'ingredients'
-                )
-            )
-            ingredients = (
-                recipes.order_by('ingredients__ingredient__name').values(
-                    'ingredients__ingredient__name',
-                    'ingredients__ingredient__measurement_unit'
-                ).annotate(
-                    total=Sum('ingredients__amount')
-                )
-            )
-        except ShoppingCart.DoesNotExist:
+        if not ShoppingCart.objects.filter(user=request.user).exists():
             return Response(
                 {'error': 'У вас нет списка покупок!'},
                 status=HTTP_400_BAD_REQUEST
             )
-        content = 'Список необходимых продуктов:\n'
-        for i, ingredient in enumerate(ingredients, start=1):
-            content += (
-                f'{i}) {ingredient["ingredients__ingredient__name"]} '
-                f' — {ingredient["total"]}'
-                f' {ingredient["ingredients__ingredient__measurement_unit"]}'
-                f'\r\n'
-            )
-        response = HttpResponse(
-            content, content_type='text/plain,charset=utf8'
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            RENDERERS[renderer.format](get_ingredients(request.user)),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename={FILE_NAME}.{renderer.format}'
         )
-        response['Content-Disposition'] = f'attachment; filename={FILE_NAME}'
         return response
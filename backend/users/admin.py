@@ -12,7 +12,7 @@ class UserAdmin(UserAdmin):
     model = User
     list_display = (
         'id', 'email', 'username', 'first_name', 'last_name', 'is_blocked',
-        'is_superuser',
+        'is_superuser', 'recipes_count', 'subscribers_count',
     )
     list_filter = (
         'email', 'username', 'is_blocked', 'is_superuser',
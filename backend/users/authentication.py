@@ -0,0 +1,46 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+PROCESS_LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def get_token_cache_key(key):
+    return f'users:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_tokens(keys):
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that keeps token lookups in the cache.
+
+    A hit costs no queries. Entries are dropped when the token is deleted
+    or its user is saved, so blocking a user or changing the password
+    takes effect on the next request; blocked users are rejected here
+    rather than only at login.
+
+    The invalidation has to reach every worker, so with a process-local
+    cache tokens are always checked against the database.
+    """
+
+    def authenticate_credentials(self, key):
+        if settings.CACHES['default']['BACKEND'] == PROCESS_LOCAL_CACHE:
+            token = super().authenticate_credentials(key)[1]
+        else:
+            token = self.get_cached_token(key)
+        if token.user.is_blocked:
+            raise AuthenticationFailed('Аккаунт заблокирован!')
+        return token.user, token
+
+    def get_cached_token(self, key):
+        cache_key = get_token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+        return token
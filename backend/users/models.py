@@ -12,6 +12,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     password = models.CharField('Пароль', max_length=150)
     is_superuser = models.BooleanField('Администратор', default=False)
     is_blocked = models.BooleanField('Заблокирован', default=False)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -42,7 +48,8 @@ class Subscribe(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='subscribing',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False,
     )
 
     class Meta:
@@ -54,6 +61,12 @@ class Subscribe(models.Model):
                 name='unique_subscribe',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user',),
+                name='subscribe_author_user_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} -> {self.author}'
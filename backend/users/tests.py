@@ -0,0 +1,152 @@
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .authentication import get_token_cache_key
+from .models import Subscribe, User
+from recipes.models import Recipe
+
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }
+}
+ME = '/api/users/me/'
+SUBSCRIPTIONS = '/api/users/subscriptions/'
+
+
+def create_user(name):
+    return User.objects.create_user(
+        username=name,
+        email=f'{name}@example.com',
+        password='password',
+        first_name=name,
+        last_name=name,
+    )
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class CachedTokenAuthenticationTest(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@example.com',
+            password='password',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_is_cached(self):
+        self.assertEqual(self.client.get(ME).status_code, 200)
+        self.assertIsNotNone(cache.get(get_token_cache_key(self.token.key)))
+
+    def test_blocked_user_is_rejected(self):
+        self.client.get(ME)
+        self.user.is_blocked = True
+        self.user.save()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get(ME)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_password_change_revokes_cached_token(self):
+        self.client.get(ME)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(self.client.get(ME).status_code, 200)
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
+
+
+class SubscriptionsTest(APITestCase):
+    """The subscription list takes a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{i}') for i in range(6)]
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {i}',
+                image='recipes/images/test.gif',
+                text='Описание рецепта.',
+                cooking_time=10,
+            )
+            for author in cls.authors
+            for i in range(4)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_no_subscriptions(self):
+        response = self.client.get(SUBSCRIPTIONS)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_queries_do_not_grow_with_page(self):
+        Subscribe.objects.bulk_create(
+            Subscribe(user=self.user, author=author)
+            for author in self.authors
+        )
+        for limit in (1, 6):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(3):
+                    response = self.client.get(
+                        f'{SUBSCRIPTIONS}?limit={limit}&recipes_limit=3'
+                    )
+                self.assertEqual(len(response.data['results']), limit)
+                self.assertEqual(
+                    len(response.data['results'][0]['recipes']), 3
+                )
+
+
+class SubscribersCounterTest(APITestCase):
+    """A subscription is not kept if its counter update fails."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/users/{self.author.pk}/subscribe/'
+
+    def test_failed_counter_update_rolls_back_subscription(self):
+        with mock.patch.object(
+            QuerySet, 'update', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.post(self.url)
+        self.assertFalse(Subscribe.objects.exists())
+
+    def test_failed_counter_update_keeps_subscription(self):
+        self.client.post(self.url)
+        with mock.patch.object(
+            QuerySet, 'update', side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.delete(self.url)
+        self.assertTrue(Subscribe.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
@@ -1,4 +1,5 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Value
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from djoser.views import TokenCreateView, UserViewSet
@@ -14,8 +15,9 @@ from rest_framework.status import (
 )
 
 from .models import Subscribe, User
-from .serializers import SubscriptionSerializer
+from .serializers import RecipesLimitSerializer, SubscriptionSerializer
 from common.pagination import LimitPageNumberPagination
+from recipes.models import Recipe
 
 
 class TokenCreateWithCheckBlockStatusView(TokenCreateView):
@@ -32,18 +34,45 @@ class UserSubscribeViewSet(UserViewSet):
     pagination_class = LimitPageNumberPagination
     lookup_url_kwarg = 'user_id'
 
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
     def get_subscribtion_serializer(self, *args, **kwargs):
-        kwargs.setdefault('context', self.get_serializer_context())
+        kwargs.setdefault('context', {
+            **self.get_serializer_context(),
+            'recipes_limit': self.get_recipes_limit(),
+        })
         return SubscriptionSerializer(*args, **kwargs)
 
+    def attach_recipe_previews(self, authors):
+        previews = {author.pk: [] for author in authors}
+        recipes = Recipe.objects.latest_by_author(
+            previews, self.get_recipes_limit()
+        )
+        for recipe in recipes:
+            previews[recipe.author_id].append(recipe)
+        for author in authors:
+            author.recipe_previews = previews[author.pk]
+        return authors
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        queryset = User.objects.filter(subscribing__user=request.user)
+        queryset = User.objects.filter(
+            subscribing__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_subscribtion_serializer(page, many=True)
+            serializer = self.get_subscribtion_serializer(
+                self.attach_recipe_previews(page), many=True
+            )
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_subscribtion_serializer(queryset, many=True)
+        serializer = self.get_subscribtion_serializer(
+            self.attach_recipe_previews(list(queryset)), many=True
+        )
         return Response(serializer.data, status=HTTP_200_OK)
 
     def create_subscribe(self, request, author):
@@ -53,10 +82,13 @@ class UserSubscribeViewSet(UserViewSet):
                 status=HTTP_400_BAD_REQUEST,
             )
         try:
-            subscribe = Subscribe.objects.create(
-                user=request.user,
-                author=author,
-            )
+            # The subscribers counter is updated by a signal in the same
+            # transaction as the row.
+            with transaction.atomic():
+                subscribe = Subscribe.objects.create(
+                    user=request.user,
+                    author=author,
+                )
         except IntegrityError:
             return Response(
                 {'error': 'Нельзя подписаться дважды!'},
@@ -67,11 +99,12 @@ class UserSubscribeViewSet(UserViewSet):
 
     def delete_subscribe(self, request, author):
         try:
-            get_object_or_404(
-                Subscribe,
-                user=request.user,
-                author=author
-            ).delete()
+            with transaction.atomic():
+                get_object_or_404(
+                    Subscribe,
+                    user=request.user,
+                    author=author
+                ).delete()
         except Subscribe.DoesNotExist:
             return Response(
                 {'error': ('Нельзя отписаться от пользователя, '